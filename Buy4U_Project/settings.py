@@ -76,7 +76,6 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "services.tracking_app.middleware.UserInteractionMiddleware",
-    "services.browsing_app.middleware.BrowsingHistoryMiddleware",
 ]
 
 ROOT_URLCONF = "Buy4U_Project.urls"
@@ -165,3 +164,80 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 WEATHER_API_KEY = os.getenv("WEATHER_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+# Límites de los rangos de precio en las facetas de la tienda (shop/facets.py)
+SHOP_PRICE_BUCKETS = [250, 500, 1000, 2000]
+
+# Anchos (px) de las miniaturas JPEG/WebP de los productos (shop/images.py)
+SHOP_IMAGE_WIDTHS = [200, 400, 800]
+
+# Segundos que la pasarela de pago aparta el stock del carrito
+# (orders/reservations.py)
+ORDERS_RESERVATION_TTL = int(os.getenv("ORDERS_RESERVATION_TTL", "600"))
+
+# Segundos mínimos entre acumulaciones de rollups disparadas por los
+# reportes del admin (shop/rollups.py). "manage.py refresh_rollups" no espera.
+SHOP_ROLLUP_INTERVAL = int(os.getenv("SHOP_ROLLUP_INTERVAL", "300"))
+
+# Contador agrupado de "agregado al carrito" (shop/counters.py)
+SHOP_CART_COUNTER = {
+    "FLUSH_SIZE": int(os.getenv("SHOP_CART_FLUSH_SIZE", "100")),
+    "FLUSH_INTERVAL": float(os.getenv("SHOP_CART_FLUSH_INTERVAL", "10")),
+}
+
+# Buffer de eventos de tracking (services/tracking_app/buffer.py).
+TRACKING_BUFFER = {
+    "FLUSH_SIZE": int(os.getenv("TRACKING_FLUSH_SIZE", "50")),
+    "FLUSH_INTERVAL": float(os.getenv("TRACKING_FLUSH_INTERVAL", "5")),
+    "MAX_PENDING": int(os.getenv("TRACKING_MAX_PENDING", "5000")),
+}
+
+# Modo spool: en picos de tráfico los eventos se escriben en segmentos JSONL
+# locales y se cargan luego con "python manage.py load_events".
+TRACKING_SPOOL = {
+    "ENABLED": os.getenv("TRACKING_SPOOL", "False").lower() in ("1", "true", "yes"),
+    "DIR": os.getenv("TRACKING_SPOOL_DIR", BASE_DIR / "spool" / "events"),
+    "SEGMENT_MAX_BYTES": int(os.getenv("TRACKING_SPOOL_SEGMENT_BYTES", "8388608")),
+    "SEGMENT_MAX_AGE": int(os.getenv("TRACKING_SPOOL_SEGMENT_AGE", "300")),
+}
+
+# Muestreo de tracking por tipo de fila (event_type de Event o action de
+# BrowsingHistory). Ej: TRACKING_SAMPLE_VIEW=0.1 guarda 1 de cada 10 vistas con
+# sample_weight=10. Todas las filas de una interacción se guardan o descartan
+# juntas con la menor de sus tasas. Si el buffer se atrasa se pasa a
+# DEGRADED_RATES (ver services/tracking_app/sampling.py). Las compras nunca se
+# muestrean.
+TRACKING_SAMPLING = {
+    "RATES": {
+        "view": float(os.getenv("TRACKING_SAMPLE_VIEW", "1")),
+        "product_view": float(os.getenv("TRACKING_SAMPLE_PRODUCT_VIEW", "1")),
+        "search": float(os.getenv("TRACKING_SAMPLE_SEARCH", "1")),
+        "click": float(os.getenv("TRACKING_SAMPLE_CLICK", "1")),
+    },
+    "MAX_FLUSH_SECONDS": float(os.getenv("TRACKING_DEGRADE_FLUSH_SECONDS", "0.5")),
+    "MAX_PENDING": int(os.getenv("TRACKING_DEGRADE_PENDING", "1000")),
+}
+
+# Retención de tracking: "python manage.py prune_tracking" archiva y borra
+# las filas más viejas que los días indicados para cada tabla.
+TRACKING_RETENTION = {
+    "POLICIES": {
+        "tracking_app.Event": int(os.getenv("TRACKING_EVENT_RETENTION_DAYS", "90")),
+        "browsing_app.BrowsingHistory": int(
+            os.getenv("TRACKING_BROWSING_RETENTION_DAYS", "90")
+        ),
+    },
+    "ARCHIVE_DIR": os.getenv("TRACKING_ARCHIVE_DIR", BASE_DIR / "archive" / "tracking"),
+    "CHUNK_SIZE": int(os.getenv("TRACKING_RETENTION_CHUNK_SIZE", "500")),
+}
+
+# Tendencias en memoria (services/tracking_app/trending.py). Una vista pierde
+# la mitad de su peso cada HALF_LIFE segundos.
+TRACKING_TRENDING = {
+    "CAPACITY": int(os.getenv("TRACKING_TRENDING_CAPACITY", "200")),
+    "HALF_LIFE": float(os.getenv("TRACKING_TRENDING_HALF_LIFE", "3600")),
+    "CHECKPOINT_PATH": os.getenv(
+        "TRACKING_TRENDING_PATH", BASE_DIR / "spool" / "trending.json"
+    ),
+    "CHECKPOINT_INTERVAL": int(os.getenv("TRACKING_TRENDING_CHECKPOINT", "60")),
+}
@@ -0,0 +1,15 @@
+"""
+Settings para correr los tests ("manage.py test" y pytest).
+
+Parten de los de producción y solo cambian lo que los tests necesitan:
+los buffers se escriben al final de cada request, así las aserciones ven
+las filas y no quedan pendientes que el flush de salida escriba en la base
+de desarrollo, y las tendencias no guardan checkpoint en disco.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import SHOP_CART_COUNTER, TRACKING_BUFFER, TRACKING_TRENDING
+
+SHOP_CART_COUNTER = {**SHOP_CART_COUNTER, "FLUSH_SIZE": 1}
+TRACKING_BUFFER = {**TRACKING_BUFFER, "FLUSH_SIZE": 1}
+TRACKING_TRENDING = {**TRACKING_TRENDING, "CHECKPOINT_PATH": None}
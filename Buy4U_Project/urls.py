@@ -38,6 +38,7 @@ urlpatterns = [
     path("api/", include("api.urls")),
     path("", include("services.reviews_app.urls")),
     path("reviews/", include("services.reviews_app.urls")),
+    path("admin/tracking/", include("services.tracking_app.urls")),
     path("admin/", admin.site.urls),
 ] 
 
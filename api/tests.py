@@ -1,3 +1,31 @@
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from shop.models import Product
+
+
+class ProductAPIConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(
+            name="API Phone", price=100, type="Smartphones", quantity=2
+        )
+
+    def test_list_not_modified(self):
+        url = reverse("product-list")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("public", response["Cache-Control"])
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_changes_after_save(self):
+        url = reverse("product-detail", args=[self.product.id])
+        etag = self.client.get(url)["ETag"]
+        self.product.quantity = 1
+        self.product.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["quantity"], 1)
@@ -1,12 +1,15 @@
 from django.shortcuts import render
+from django.utils.decorators import method_decorator
 from rest_framework import generics, permissions
 
+from shop.conditional import api_etag, conditional_get
 from shop.models import Product
 
 from .serializers import ProductSerializer
 
 
-# Create your views here.
+# 304 si el catálogo no cambió desde la última consulta (shop/conditional.py)
+@method_decorator(conditional_get(api_etag, private=False), name="get")
 class ProductListAPIView(generics.ListAPIView):
     serializer_class = ProductSerializer
     queryset = Product.objects.filter(quantity__gt=0)  # Solo productos en stock
@@ -15,6 +18,7 @@ class ProductListAPIView(generics.ListAPIView):
     ]  # Permite el acceso a todos los usuarios sin autenticación
 
 
+@method_decorator(conditional_get(api_etag, private=False), name="get")
 class ProductDetailAPIView(generics.RetrieveAPIView):
     serializer_class = ProductSerializer
     queryset = Product.objects.all()  # Obtiene todos los productos
@@ -6,7 +6,9 @@ import sys
 
 def main():
     """Run administrative tasks."""
-    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Buy4U_Project.settings")
+    # Los tests usan sus propios settings (Buy4U_Project/test_settings.py)
+    settings_module = "test_settings" if sys.argv[1:2] == ["test"] else "settings"
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", f"Buy4U_Project.{settings_module}")
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -0,0 +1,168 @@
+"""
+Checkout de un carrito completo en una sola transacción.
+
+El stock se descuenta con un UPDATE condicional por producto:
+
+    UPDATE shop_product SET quantity = quantity - n
+    WHERE id = ? AND quantity >= n
+
+Lo apartado por otras sesiones (reservations.py) tampoco se puede vender.
+Si alguna fila no se actualiza otra compra se llevó el stock: se lanza
+OutOfStock y la transacción se revierte completa (orden, líneas y los
+descuentos ya hechos). Así dos compras simultáneas nunca venden de más,
+sin leer-modificar-escribir en Python.
+
+Con SQLite un solo proceso escribe a la vez; si la base está bloqueada
+("database is locked") se reintenta la transacción entera con espera
+creciente. Nunca después del commit: un error en los callbacks on_commit
+no debe crear una segunda orden.
+"""
+
+import random
+import time
+
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from shop.catalog import bump_catalog_version
+from services.tracking_app.purchases import log_purchase
+from shop.models import Product
+
+from .models import Order, ProductOrder, StockReservation
+from .reservations import expiry, held_quantities, held_subquery, release
+
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 0.05  # segundos; se duplica en cada intento
+
+
+class OutOfStock(Exception):
+    def __init__(self, product, available):
+        super().__init__(f"{product.name}: solo quedan {available}")
+        self.product = product
+        self.available = available
+
+
+def _is_locked(error):
+    return "locked" in str(error) or "busy" in str(error)
+
+
+def _atomic_with_retry(func, *args):
+    """Corre func dentro de transaction.atomic, reintentando si está bloqueada."""
+    # Dentro de una transacción ajena no se puede reintentar: se propaga
+    attempts = 1 if connection.in_atomic_block else MAX_ATTEMPTS
+    committed = []
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic():
+                # Primer callback: marca que el commit ya ocurrió
+                transaction.on_commit(lambda: committed.append(True))
+                return func(*args)
+        except OperationalError as error:
+            if committed or not _is_locked(error) or attempt == attempts - 1:
+                raise
+            time.sleep(RETRY_DELAY * 2**attempt * random.uniform(1, 1.5))
+
+
+def _reserve(lines, session_key, user):
+    # Primero la escritura: con SQLite toma el lock antes de leer el stock
+    release(session_key)
+    ids = [line.product.pk for line in lines]
+    products = Product.objects.select_for_update().in_bulk(ids)
+    held = held_quantities(ids, exclude_session=session_key)
+    for line in lines:
+        product = products.get(line.product.pk)
+        available = product.quantity - held.get(product.pk, 0) if product else 0
+        if available < line.quantity:
+            raise OutOfStock(product or line.product, max(available, 0))
+    expires_at = expiry()
+    StockReservation.objects.bulk_create(
+        StockReservation(
+            product_id=line.product.pk,
+            quantity=line.quantity,
+            session_key=session_key,
+            user=user,
+            expires_at=expires_at,
+        )
+        for line in lines
+    )
+    return expires_at
+
+
+def reserve_cart(lines, session_key, user=None):
+    """
+    Aparta el stock de `lines` para la sesión (reemplaza sus apartados
+    anteriores) y devuelve hasta cuándo. Lanza OutOfStock si lo disponible
+    para vender, descontando apartados de otras sesiones, no alcanza.
+    """
+    if user is not None and not user.is_authenticated:
+        user = None
+    return _atomic_with_retry(_reserve, list(lines), session_key, user)
+
+
+def replayed_order(idempotency_key, user=None):
+    """Orden ya creada con esta clave por el mismo usuario, o None."""
+    if not idempotency_key:
+        return None
+    if user is not None and not user.is_authenticated:
+        user = None
+    return Order.objects.filter(idempotency_key=idempotency_key, user=user).first()
+
+
+def _place(lines, user, session_key, idempotency_key):
+    order = Order.objects.create(user=user, idempotency_key=idempotency_key)
+    now = timezone.now()
+    # Lo apartado por otras sesiones no se puede vender
+    held = held_subquery(exclude_session=session_key, now=now)
+    # Siempre en el mismo orden para no cruzar bloqueos entre compras
+    for line in sorted(lines, key=lambda line: line.product.pk):
+        updated = Product.objects.filter(
+            pk=line.product.pk, quantity__gte=held + line.quantity
+        ).update(quantity=F("quantity") - line.quantity, updated_at=now)
+        if not updated:
+            available = (
+                Product.objects.filter(pk=line.product.pk)
+                .annotate(available=F("quantity") - held)
+                .values_list("available", flat=True)
+                .first()
+            )
+            raise OutOfStock(line.product, max(available or 0, 0))
+    # bulk_create no dispara post_save de ProductOrder; el de Order ya
+    # programa la invalidación de compras del usuario
+    ProductOrder.objects.bulk_create(
+        ProductOrder(order=order, product=line.product, quantity=line.quantity)
+        for line in lines
+    )
+    # El apartado de esta sesión se convirtió en la orden
+    release(session_key)
+    # update() tampoco dispara señales: el stock cambió en el catálogo
+    transaction.on_commit(bump_catalog_version)
+    # Evento 'purchase' con las líneas ya confirmadas. robust: si falla
+    # (p. ej. base bloqueada) se loguea, pero la compra no es un error
+    transaction.on_commit(lambda: log_purchase(order), robust=True)
+    return order
+
+
+def place_order(lines, user=None, session_key=None, idempotency_key=None):
+    """
+    Crea la orden de `lines` (CartLine de shop/cart.py), descuenta el stock
+    y libera los apartados de `session_key`. Lanza OutOfStock si algún
+    producto no alcanza.
+
+    Si otra request ya creó la orden con la misma `idempotency_key` (doble
+    clic) el índice único hace fallar el INSERT, se revierte todo y se
+    devuelve esa orden sin tocar el stock.
+    """
+    lines = list(lines)
+    if user is not None and not user.is_authenticated:
+        user = None
+    try:
+        order = _atomic_with_retry(_place, lines, user, session_key, idempotency_key)
+    except IntegrityError:
+        order = replayed_order(idempotency_key, user)
+        if order is None:
+            raise
+        return order
+    for line in lines:
+        line.product.quantity -= line.quantity
+    return order
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from orders.reservations import expire_reservations
+
+
+class Command(BaseCommand):
+    help = "Borra los apartados de stock vencidos (correr periódicamente, p. ej. cron)"
+
+    def handle(self, *args, **options):
+        deleted = expire_reservations()
+        self.stdout.write(f"{deleted} apartados vencidos borrados")
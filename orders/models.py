@@ -27,6 +27,11 @@ class Order(models.Model):
 
     products = models.ManyToManyField(Product, through="ProductOrder")
     status = models.CharField(max_length=20, choices=ESTADO_CHOICES, default="pending")
+    # Clave que manda el formulario de pago: un reenvío del mismo POST
+    # devuelve esta orden en vez de crear otra (orders/checkout.py)
+    idempotency_key = models.CharField(
+        max_length=64, unique=True, null=True, blank=True, editable=False
+    )
 
     def __str__(self):
         return f"Order {self.order_id} - Status: {self.status}"
@@ -52,3 +57,35 @@ class ProductOrder(models.Model):
 
     def __str__(self):
         return f"{self.quantity}x {self.product.name} in Order {self.order.order_id}"
+
+
+class StockReservation(models.Model):
+    """
+    Stock apartado para un carrito entre la pasarela de pago y el pago.
+    Vence en expires_at; las vencidas no cuentan y el comando
+    expire_reservations las borra (ver orders/reservations.py).
+    """
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="reservations"
+    )
+    quantity = models.PositiveIntegerField()
+    session_key = models.CharField(max_length=40)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # Suma de apartados vigentes por producto (disponible para vender)
+            models.Index(
+                fields=["product", "expires_at"], name="reservation_active_idx"
+            ),
+            models.Index(fields=["session_key"], name="reservation_session_idx"),
+            models.Index(fields=["expires_at"], name="reservation_expiry_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity}x {self.product_id} until {self.expires_at}"
@@ -0,0 +1,70 @@
+"""
+Apartados de stock con vencimiento (StockReservation).
+
+La pasarela de pago aparta las cantidades del carrito por
+ORDERS_RESERVATION_TTL segundos (checkout.reserve_cart) y el pago convierte
+el apartado en la orden (checkout.place_order). Para todos los demás el
+disponible para vender es:
+
+    quantity - suma de apartados vigentes de otras sesiones
+
+Los apartados vencidos dejan de contar solos (se filtra por expires_at);
+"manage.py expire_reservations" solo borra las filas viejas.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import StockReservation
+
+
+def expiry():
+    return timezone.now() + timedelta(seconds=settings.ORDERS_RESERVATION_TTL)
+
+
+def active(exclude_session=None, now=None):
+    holds = StockReservation.objects.filter(expires_at__gt=now or timezone.now())
+    if exclude_session:
+        holds = holds.exclude(session_key=exclude_session)
+    return holds
+
+
+def held_quantities(product_ids, exclude_session=None):
+    """{product_id: unidades apartadas vigentes} en una consulta."""
+    return dict(
+        active(exclude_session)
+        .filter(product_id__in=product_ids)
+        .values_list("product_id")
+        .annotate(total=Sum("quantity"))
+    )
+
+
+def held_subquery(exclude_session=None, now=None):
+    """
+    Apartados vigentes del producto de la fila externa, para usar dentro de
+    un UPDATE/filter sobre Product (0 si no hay).
+    """
+    held = (
+        active(exclude_session, now)
+        .filter(product_id=OuterRef("pk"))
+        .values("product_id")
+        .annotate(total=Sum("quantity"))
+        .values("total")
+    )
+    return Coalesce(Subquery(held, output_field=IntegerField()), 0)
+
+
+def release(session_key):
+    if session_key:
+        StockReservation.objects.filter(session_key=session_key).delete()
+
+
+def expire_reservations(now=None):
+    deleted, _ = StockReservation.objects.filter(
+        expires_at__lte=now or timezone.now()
+    ).delete()
+    return deleted
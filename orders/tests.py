@@ -1,3 +1,207 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from shop.cart import CartLine
+from shop.models import Product
+
+from .checkout import OutOfStock, place_order, reserve_cart
+from .models import Order, ProductOrder, StockReservation
+from .reservations import held_quantities
+
+
+class CheckoutViewsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("buyer", password="pw")
+        self.client.force_login(self.user)
+        self.phone = Product.objects.create(name="Phone", price=100, quantity=5)
+        self.case = Product.objects.create(name="Case", price=10, quantity=5)
+
+    def fill(self, **quantities):
+        session = self.client.session
+        session["cart_product_data"] = {
+            str(getattr(self, name).id): quantity
+            for name, quantity in quantities.items()
+        }
+        session.save()
+
+    def product_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("payment_gateway"))
+        self.assertEqual(response.status_code, 200)
+        return [q for q in queries if 'FROM "shop_product"' in q["sql"]]
+
+    def test_gateway_queries_do_not_grow_with_cart(self):
+        self.fill(phone=1)
+        one = self.product_queries()
+        self.fill(phone=1, case=3)
+        two = self.product_queries()
+        # Carga del carrito + relectura con lock al apartar
+        self.assertEqual(len(one), 2)
+        self.assertEqual(len(two), 2)
+
+    def test_gateway_rejects_missing_stock(self):
+        self.fill(phone=9)
+        response = self.client.get(reverse("payment_gateway"))
+        self.assertRedirects(response, reverse("cart_index"))
+
+    def test_payment_creates_a_single_order(self):
+        self.fill(phone=1, case=3)
+        response = self.client.post(reverse("process_payment"))
+        order = Order.objects.get()
+        self.assertRedirects(
+            response,
+            reverse("order_confirmation", kwargs={"order_id": order.order_id}),
+        )
+        self.assertEqual(ProductOrder.objects.filter(order=order).count(), 2)
+        self.phone.refresh_from_db()
+        self.assertEqual(self.phone.quantity, 4)
+        self.assertEqual(self.client.session["cart_product_data"], {})
+
+    def test_stock_taken_meanwhile_rolls_back(self):
+        lines = [CartLine(self.case, 1), CartLine(self.phone, 2)]
+        # Otra compra se lleva el stock después de cargar el carrito
+        Product.objects.filter(pk=self.phone.pk).update(quantity=1)
+        with self.assertRaises(OutOfStock) as raised:
+            place_order(lines, self.user)
+        self.assertEqual(raised.exception.available, 1)
+        self.assertFalse(Order.objects.exists())
+        self.case.refresh_from_db()
+        self.assertEqual(self.case.quantity, 5)
+
+
+class StockReservationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.phone = Product.objects.create(name="Phone", price=100, quantity=3)
+
+    def test_gateway_reserves_and_payment_converts(self):
+        session = self.client.session
+        session["cart_product_data"] = {str(self.phone.id): 2}
+        session.save()
+        response = self.client.get(reverse("payment_gateway"))
+        self.assertIsNotNone(response.context["reserved_until"])
+        self.assertEqual(held_quantities([self.phone.id]), {self.phone.id: 2})
+        # Volver a la pasarela reemplaza el apartado, no lo suma
+        self.client.get(reverse("payment_gateway"))
+        self.assertEqual(held_quantities([self.phone.id]), {self.phone.id: 2})
+
+        self.client.post(reverse("process_payment"))
+        self.assertFalse(StockReservation.objects.exists())
+        self.phone.refresh_from_db()
+        self.assertEqual(self.phone.quantity, 1)
+
+    def test_holds_block_other_sessions(self):
+        reserve_cart([CartLine(self.phone, 2)], "first")
+        with self.assertRaises(OutOfStock) as raised:
+            reserve_cart([CartLine(self.phone, 2)], "second")
+        self.assertEqual(raised.exception.available, 1)
+        with self.assertRaises(OutOfStock):
+            place_order([CartLine(self.phone, 2)], session_key="second")
+        # La sesión dueña del apartado sí puede comprar
+        place_order([CartLine(self.phone, 2)], session_key="first")
+        self.phone.refresh_from_db()
+        self.assertEqual(self.phone.quantity, 1)
+
+    def test_expired_holds_do_not_count_and_are_swept(self):
+        reserve_cart([CartLine(self.phone, 3)], "first")
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(1))
+        self.assertEqual(held_quantities([self.phone.id]), {})
+        reserve_cart([CartLine(self.phone, 3)], "second")
+        out = StringIO()
+        call_command("expire_reservations", stdout=out)
+        self.assertIn("1 apartados", out.getvalue())
+        self.assertEqual(StockReservation.objects.get().session_key, "second")
+
+
+class IdempotentCheckoutTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("buyer", password="pw")
+        self.client.force_login(self.user)
+        self.phone = Product.objects.create(name="Phone", price=100, quantity=5)
+        session = self.client.session
+        session["cart_product_data"] = {str(self.phone.id): 2}
+        session.save()
+
+    def test_replayed_post_returns_original_order(self):
+        response = self.client.get(reverse("payment_gateway"))
+        key = response.context["idempotency_key"]
+        self.assertContains(response, f'value="{key}"')
+
+        first = self.client.post(reverse("process_payment"), {"idempotency_key": key})
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.post(
+                reverse("process_payment"), {"idempotency_key": key}
+            )
+        writes = [
+            q["sql"]
+            for q in queries
+            if q["sql"].startswith(("INSERT", "UPDATE"))
+            and ("shop_product" in q["sql"] or "orders_" in q["sql"])
+        ]
+        self.assertEqual(writes, [])
+        self.assertEqual(first["Location"], second["Location"])
+        self.assertEqual(Order.objects.get().idempotency_key, key)
+        self.phone.refresh_from_db()
+        self.assertEqual(self.phone.quantity, 3)
+
+    def test_concurrent_duplicate_rolls_back(self):
+        key = "a" * 32
+        existing = Order.objects.create(user=self.user, idempotency_key=key)
+        order = place_order([CartLine(self.phone, 2)], self.user, idempotency_key=key)
+        self.assertEqual(order, existing)
+        self.assertEqual(Order.objects.count(), 1)
+        self.phone.refresh_from_db()
+        self.assertEqual(self.phone.quantity, 5)
+
+    def test_missing_key_still_checks_out(self):
+        self.client.post(reverse("process_payment"))
+        self.assertIsNone(Order.objects.get().idempotency_key)
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    BUYERS = 12
+    STOCK = 5
+
+    def test_parallel_buyers_never_oversell(self):
+        product = Product.objects.create(name="Hot", price=10, quantity=self.STOCK)
+        results = []
+        barrier = threading.Barrier(self.BUYERS)
+
+        def buy():
+            try:
+                line = CartLine(Product.objects.get(pk=product.pk), 1)
+                barrier.wait()
+                try:
+                    place_order([line])
+                    results.append("ok")
+                except OutOfStock:
+                    results.append("out")
+            except Exception as error:  # se reporta abajo
+                results.append(repr(error))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy) for _ in range(self.BUYERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        product.refresh_from_db()
+        self.assertEqual(sorted(set(results)), ["ok", "out"], results)
+        self.assertEqual(results.count("ok"), self.STOCK)
+        self.assertEqual(product.quantity, 0)
+        self.assertEqual(Order.objects.count(), self.STOCK)
+        self.assertEqual(ProductOrder.objects.count(), self.STOCK)
@@ -1,3 +1,6 @@
+import re
+import uuid
+
 import requests
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -9,16 +12,42 @@ from django.utils.translation import gettext_lazy as _
 from django.views import View
 from django.views.generic import ListView
 
-from shop.models import Product
+from shop.cart import Cart
+
+from .checkout import OutOfStock, place_order, replayed_order, reserve_cart
+from .models import Order, ProductOrder
+
+
+def out_of_stock_error(request, product, available):
+    messages.error(
+        request,
+        _(
+            "There is not enough stock for %(product_name)s. Only %(available_quantity)d available."
+        )
+        % {
+            "product_name": product.name,
+            "available_quantity": available,
+        },
+    )
+
+
+def session_key(request):
+    if request.session.session_key is None:
+        request.session.save()
+    return request.session.session_key
 
-from .models import Order, Product, ProductOrder
+
+IDEMPOTENCY_KEY_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+def idempotency_key(request):
+    key = request.POST.get("idempotency_key", "")
+    return key if IDEMPOTENCY_KEY_RE.match(key) else None
 
 
 class DoAnOrderView(View):
     def post(self, request):
-        cart_products = request.session.get("cart_product_data", {})
-
-        if not cart_products:
+        if not Cart.for_request(request):
             messages.error(request, _("Oops! Your cart is currently empty."))
             return redirect("cart_index")
 
@@ -37,47 +66,33 @@ class OrderConfirmationView(View):
 
 class PaymentGatewayView(View):
     def get(self, request):
-        # Sacar los productos del carrito
-        cart_products = request.session.get("cart_product_data", {})
+        # Sacar los productos del carrito (una sola consulta)
+        cart = Cart.for_request(request)
 
-        if not cart_products:
+        if not cart:
             messages.error(request, _("Oops! Your cart is currently empty."))
             return redirect("cart_index")
 
-        # Sabar los detalles de los productos y sumar el total
-        products = []
-        total = 0
-
-        for product_id, quantity in cart_products.items():
-            product = Product.objects.get(id=product_id)
-
-            if product.quantity < int(quantity):
-                messages.error(
-                    request,
-                    _(
-                        "There is not enough stock for %(product_name)s. Only %(available_quantity)d available."
-                    )
-                    % {
-                        "product_name": product.name,
-                        "available_quantity": product.quantity,
-                    },
-                )
-                return redirect("cart_index")
-
-            subtotal = product.price * int(quantity)
-            total += subtotal
-            products.append(
-                {
-                    "product": product,
-                    "quantity": quantity,
-                    "subtotal": subtotal,
-                }
-            )
+        missing = cart.out_of_stock()
+        if missing:
+            product = missing[0].product
+            out_of_stock_error(request, product, product.quantity)
+            return redirect("cart_index")
+
+        # Apartar el stock mientras el usuario paga (orders/reservations.py)
+        try:
+            reserved_until = reserve_cart(cart, session_key(request), request.user)
+        except OutOfStock as error:
+            out_of_stock_error(request, error.product, error.available)
+            return redirect("cart_index")
 
         # Enviar datos a plantilla
         context = {
-            "products": products,
-            "total": total,
+            "products": cart.lines,
+            "total": cart.total,
+            "reserved_until": reserved_until,
+            # Un reenvío del formulario con la misma clave no crea otra orden
+            "idempotency_key": uuid.uuid4().hex,
         }
         return render(request, "pages/payment_gateway.html", context)
 
@@ -85,45 +100,37 @@ class PaymentGatewayView(View):
 class ProcessPaymentView(View):
     def post(self, request):
         # Aqui voy a redirigit los fuckings pagos, nada del otro mundo, algo sencillo
+        # Un POST repetido (doble clic, reintento) vuelve a la misma confirmación
+        key = idempotency_key(request)
+        order = replayed_order(key, request.user)
+        if order is not None:
+            return redirect(
+                reverse("order_confirmation", kwargs={"order_id": order.order_id})
+            )
+
         # Sacar productos
-        cart_products = request.session.get("cart_product_data", {})
+        cart = Cart.for_request(request)
 
-        if not cart_products:
+        if not cart:
             messages.error(request, _("Your cart is empty."))
             return redirect("cart_index")
 
-        for product_id, quantity in cart_products.items():
-            product = Product.objects.get(id=product_id)
-
-            if product.quantity < int(quantity):
-                messages.error(
-                    request,
-                    _(
-                        "There is not enough stock for %(product_name)s. Only %(available_quantity)d available."
-                    )
-                    % {
-                        "product_name": product.name,
-                        "available_quantity": product.quantity,
-                    },
-                )
-                return redirect("cart_index")
-
-            # Crear la orden y asignar al usuario si esta logueado
-            order = Order.objects.create(
-                user=request.user if request.user.is_authenticated else None
-            )
+        missing = cart.out_of_stock()
+        if missing:
+            product = missing[0].product
+            out_of_stock_error(request, product, product.quantity)
+            return redirect("cart_index")
 
-            for product_id, quantity in cart_products.items():
-                product = Product.objects.get(id=product_id)
-                product.quantity -= int(quantity)
-                product.save()
-                # asocia los productos a la orden
-                ProductOrder.objects.create(
-                    order=order, product=product, quantity=quantity
-                )
+        # Orden, líneas y stock en una sola transacción (orders/checkout.py);
+        # el chequeo de arriba es solo para fallar rápido
+        try:
+            order = place_order(cart, request.user, session_key(request), key)
+        except OutOfStock as error:
+            out_of_stock_error(request, error.product, error.available)
+            return redirect("cart_index")
 
         # Vaciar el carrito
-        request.session["cart_product_data"] = {}
+        cart.clear()
         messages.success(
             request,
             _("Order %(order_id)s has been successfully completed.")
@@ -7,4 +7,4 @@ from .models import BrowsingHistory
 class BrowsingHistoryAdmin(admin.ModelAdmin):
     list_display = ("action", "user", "product_id", "query", "path", "created_at")
     list_filter = ("action", "created_at")
-    search_fields = ("path", "query")
+    search_fields = ("path", "query", "visitor_id")
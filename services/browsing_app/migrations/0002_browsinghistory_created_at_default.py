@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-18 13:39
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("browsing_app", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="browsinghistory",
+            name="created_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 13:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("browsing_app", "0003_browsinghistory_visitor_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="browsinghistory",
+            name="sample_weight",
+            field=models.FloatField(default=1.0),
+        ),
+    ]
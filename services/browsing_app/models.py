@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class BrowsingHistory(models.Model):
@@ -7,11 +8,16 @@ class BrowsingHistory(models.Model):
         settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL
     )
     session_key = models.CharField(max_length=40, null=True, blank=True)
+    # Cookie firmada de visitante (services/tracking_app/visitor.py)
+    visitor_id = models.CharField(max_length=32, null=True, blank=True)
     action = models.CharField(max_length=30)  # 'product_view' | 'search'
     product_id = models.IntegerField(null=True, blank=True)
     query = models.CharField(max_length=255, null=True, blank=True)
     path = models.CharField(max_length=255, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # 1 / tasa de muestreo: los reportes suman este peso en vez de contar filas
+    sample_weight = models.FloatField(default=1.0)
+    # Se escribe por lotes desde el buffer de tracking: conservar la hora real
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         indexes = [
@@ -21,5 +27,5 @@ class BrowsingHistory(models.Model):
 
     def __str__(self):
         what = self.product_id or self.query
-        who = self.user_id or self.session_key
+        who = self.user_id or self.session_key or self.visitor_id
         return f"{self.action} - {who} - {what}"
\ No newline at end of file
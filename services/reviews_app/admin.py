@@ -1,8 +1,15 @@
 from django.contrib import admin
-from .models import Review
+from .models import ProductRatingSummary, Review
 
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ("product", "user", "rating", "useful_count", "created_at")
     list_filter = ("rating", "created_at")
     search_fields = ("user__username", "product__name", "text")
+
+
+@admin.register(ProductRatingSummary)
+class ProductRatingSummaryAdmin(admin.ModelAdmin):
+    list_display = ("product", "count", "rating_sum", "updated_at")
+    search_fields = ("product__name",)
+    readonly_fields = [f.name for f in ProductRatingSummary._meta.fields]
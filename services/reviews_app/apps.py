@@ -5,3 +5,6 @@ class ReviewsAppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "services.reviews_app"
     verbose_name = "Product Reviews"
+
+    def ready(self):
+        from . import signals  # noqa: F401
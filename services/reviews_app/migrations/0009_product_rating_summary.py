@@ -0,0 +1,61 @@
+# Generated by Django 5.1.6 on 2026-10-18 13:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_summaries(apps, schema_editor):
+    Review = apps.get_model("reviews_app", "Review")
+    ProductRatingSummary = apps.get_model("reviews_app", "ProductRatingSummary")
+    summaries = {}
+    rows = Review.objects.values("product_id", "rating").annotate(n=Count("id"))
+    for row in rows.order_by():
+        summary = summaries.setdefault(
+            row["product_id"], ProductRatingSummary(product_id=row["product_id"])
+        )
+        rating, n = row["rating"], row["n"]
+        summary.count += n
+        summary.rating_sum += rating * n
+        summary.rating_sum_sq += rating * rating * n
+        setattr(summary, f"stars_{rating}", getattr(summary, f"stars_{rating}") + n)
+    ProductRatingSummary.objects.bulk_create(summaries.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "reviews_app",
+            "0008_alter_review_unique_together_alter_review_comment_and_more",
+        ),
+        ("shop", "0011_product_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductRatingSummary",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="rating_summary",
+                        serialize=False,
+                        to="shop.product",
+                    ),
+                ),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("rating_sum", models.PositiveIntegerField(default=0)),
+                ("rating_sum_sq", models.PositiveIntegerField(default=0)),
+                ("stars_1", models.PositiveIntegerField(default=0)),
+                ("stars_2", models.PositiveIntegerField(default=0)),
+                ("stars_3", models.PositiveIntegerField(default=0)),
+                ("stars_4", models.PositiveIntegerField(default=0)),
+                ("stars_5", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
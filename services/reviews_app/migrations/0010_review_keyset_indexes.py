@@ -0,0 +1,36 @@
+# Generated by Django 5.1.6 on 2026-10-18 13:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reviews_app", "0009_product_rating_summary"),
+        ("shop", "0011_product_keyset_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["product", "-created_at", "-id"], name="review_recent_keyset"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["product", "-rating", "-created_at", "-id"],
+                name="review_rating_keyset",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["product", "-useful_count", "-created_at", "-id"],
+                name="review_useful_keyset",
+            ),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import math
+
 from django.conf import settings
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -27,6 +29,29 @@ class Review(models.Model):
     class Meta:
         # Remover unique_together ya que user puede ser null
         ordering = ["-created_at"]
+        # Índices para la paginación por keyset de cada orden del detalle
+        indexes = [
+            models.Index(
+                fields=["product", "-created_at", "-id"], name="review_recent_keyset"
+            ),
+            models.Index(
+                fields=["product", "-rating", "-created_at", "-id"],
+                name="review_rating_keyset",
+            ),
+            models.Index(
+                fields=["product", "-useful_count", "-created_at", "-id"],
+                name="review_useful_keyset",
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Guarda el rating y producto cargados para que signals.py sepa
+        # qué restar del resumen cuando la reseña se edita
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_rating = instance.__dict__.get("rating")
+        instance._loaded_product_id = instance.__dict__.get("product_id")
+        return instance
 
     def __str__(self):
         display_name = self.user_name or (self.user.username if self.user else "Anonymous")
@@ -37,3 +62,55 @@ class Review(models.Model):
         if self.user_name:
             return self.user_name
         return self.user.username if self.user else "Anonymous"
+
+
+class ProductRatingSummary(models.Model):
+    """
+    Resumen de reseñas por producto: conteo, suma, suma de cuadrados e
+    histograma de estrellas. Se actualiza en cada alta, edición o borrado
+    de una Review (ver signals.py), así las vistas no agregan sobre
+    reviews. La desviación sale de los momentos guardados.
+    """
+
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="rating_summary",
+    )
+    count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_sum_sq = models.PositiveIntegerField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.product}: {self.average:.2f} ({self.count})"
+
+    @classmethod
+    def for_product(cls, product):
+        """Resumen del producto; uno vacío (sin guardar) si no tiene reseñas."""
+        try:
+            return product.rating_summary
+        except cls.DoesNotExist:
+            return cls(product=product)
+
+    @property
+    def average(self):
+        return self.rating_sum / self.count if self.count else 0
+
+    @property
+    def stddev(self):
+        """Desviación estándar poblacional (igual que StdDev de Django)."""
+        if not self.count:
+            return 0
+        mean = self.average
+        return math.sqrt(max(self.rating_sum_sq / self.count - mean * mean, 0))
+
+    @property
+    def histogram(self):
+        return {star: getattr(self, f"stars_{star}") for star in range(1, 6)}
@@ -0,0 +1,88 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from orders.models import Order, ProductOrder
+from shop.catalog import bump_catalog_version
+from shop.models import Product
+
+from .models import ProductRatingSummary, Review
+from .utils import invalidate_order_purchases, invalidate_purchased_products
+
+
+def apply_rating(product_id, rating, sign):
+    """Suma (sign=1) o resta (sign=-1) una reseña al resumen del producto."""
+    if sign > 0:
+        ProductRatingSummary.objects.get_or_create(product_id=product_id)
+    # Al restar no se crea: si el producto se está borrando el resumen ya no está
+    updates = {
+        "count": F("count") + sign,
+        "rating_sum": F("rating_sum") + sign * rating,
+        "rating_sum_sq": F("rating_sum_sq") + sign * rating * rating,
+        "updated_at": timezone.now(),
+    }
+    if 1 <= rating <= 5:
+        updates[f"stars_{rating}"] = F(f"stars_{rating}") + sign
+    ProductRatingSummary.objects.filter(pk=product_id).update(**updates)
+
+
+def refresh_product_rating(product_id):
+    """
+    Copia el promedio del resumen a Product.rating_avg (orden por rating en
+    la tienda) e invalida las cachés del catálogo que muestran ratings.
+    """
+    summary = ProductRatingSummary.objects.filter(pk=product_id).first()
+    average = summary.average if summary else 0
+    Product.objects.filter(pk=product_id).update(rating_avg=average)
+    bump_catalog_version()
+
+
+def _remember(review):
+    review._loaded_rating = review.rating
+    review._loaded_product_id = review.product_id
+
+
+@receiver(post_save, sender=Review, dispatch_uid="reviews_summary_save")
+def review_saved(sender, instance, created, **kwargs):
+    old = (
+        getattr(instance, "_loaded_product_id", None),
+        getattr(instance, "_loaded_rating", None),
+    )
+    new = (instance.product_id, instance.rating)
+    if not created and old == new:
+        return
+    with transaction.atomic():
+        if not created and old[0] is not None:
+            apply_rating(*old, sign=-1)
+        apply_rating(*new, sign=1)
+        for product_id in {old[0], new[0]} - {None}:
+            refresh_product_rating(product_id)
+    _remember(instance)
+
+
+@receiver(post_delete, sender=Review, dispatch_uid="reviews_summary_delete")
+def review_deleted(sender, instance, **kwargs):
+    product_id = getattr(instance, "_loaded_product_id", None) or instance.product_id
+    rating = getattr(instance, "_loaded_rating", None) or instance.rating
+    with transaction.atomic():
+        apply_rating(product_id, rating, sign=-1)
+        refresh_product_rating(product_id)
+
+
+@receiver(post_save, sender=Order, dispatch_uid="reviews_purchases_order_save")
+@receiver(post_delete, sender=Order, dispatch_uid="reviews_purchases_order_delete")
+def order_changed(sender, instance, **kwargs):
+    invalidate_purchased_products(instance.user_id)
+
+
+@receiver(post_save, sender=ProductOrder, dispatch_uid="reviews_purchases_line_save")
+@receiver(
+    post_delete, sender=ProductOrder, dispatch_uid="reviews_purchases_line_delete"
+)
+def order_line_changed(sender, instance, **kwargs):
+    if ProductOrder.order.is_cached(instance):
+        invalidate_purchased_products(instance.order.user_id)
+    else:
+        invalidate_order_purchases(instance.order_id)
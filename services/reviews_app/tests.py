@@ -1,11 +1,15 @@
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
 from orders.models import Order, ProductOrder
 from shop.models import Product
 
-from .models import Review
+from .models import ProductRatingSummary, Review
+from .utils import purchased_product_ids, user_purchased_product
 
 User = get_user_model()
 
@@ -54,3 +58,114 @@ class ReviewTests(TestCase):
         self.assertEqual(
             Review.objects.filter(product=self.p, user=self.user).count(), 1
         )
+
+
+class RatingSummaryTests(TestCase):
+    def setUp(self):
+        self.p = Product.objects.create(name="Prod X", price=100)
+        self.other = Product.objects.create(name="Prod Y", price=100)
+
+    def summary(self, product=None):
+        return ProductRatingSummary.objects.get(product=product or self.p)
+
+    def test_create_edit_delete_keep_moments(self):
+        Review.objects.create(product=self.p, rating=5)
+        review = Review.objects.create(product=self.p, rating=3)
+        summary = self.summary()
+        self.assertEqual((summary.count, summary.rating_sum), (2, 8))
+        self.assertEqual(summary.histogram, {1: 0, 2: 0, 3: 1, 4: 0, 5: 1})
+        self.assertAlmostEqual(summary.stddev, 1.0)
+
+        review = Review.objects.get(pk=review.pk)
+        review.rating = 1
+        review.save()
+        summary = self.summary()
+        self.assertEqual((summary.rating_sum, summary.rating_sum_sq), (6, 26))
+        self.assertEqual(summary.stars_3, 0)
+
+        review.delete()
+        summary = self.summary()
+        self.assertEqual((summary.count, summary.average), (1, 5))
+        self.p.refresh_from_db()
+        self.assertEqual(self.p.rating_avg, 5)
+
+    def test_moving_review_updates_both_products(self):
+        review = Review.objects.create(product=self.p, rating=4)
+        review.product = self.other
+        review.save()
+        self.assertEqual(self.summary().count, 0)
+        self.assertEqual(self.summary(self.other).count, 1)
+
+    def test_deleting_product_with_reviews(self):
+        Review.objects.create(product=self.p, rating=4)
+        self.p.delete()
+        self.assertFalse(ProductRatingSummary.objects.exists())
+
+    def test_product_without_reviews_has_empty_summary(self):
+        summary = ProductRatingSummary.for_product(self.other)
+        self.assertEqual((summary.count, summary.average, summary.stddev), (0, 0, 0))
+
+
+@patch("shop.views.REVIEWS_PAGE_SIZE", 2)
+class ReviewPaginationTests(TestCase):
+    def setUp(self):
+        self.p = Product.objects.create(
+            name="Prod X", price=100, image="products/test.jpg"
+        )
+        for rating in (3, 5, 1, 4, 2):
+            Review.objects.create(product=self.p, rating=rating, comment=f"r{rating}")
+
+    def load_all(self, sort):
+        url = reverse("product_reviews_json", kwargs={"id": self.p.id})
+        response = self.client.get(reverse("product_detail", kwargs={"id": self.p.id}))
+        self.assertEqual(len(response.context["reviews"]), 2)
+        ratings, cursor = [], None
+        while True:
+            params = {"sort": sort, **({"cursor": cursor} if cursor else {})}
+            data = self.client.get(url, params).json()
+            ratings += [r["rating"] for r in data["reviews"]]
+            cursor = data["next_cursor"]
+            if not cursor:
+                return ratings
+
+    def test_rating_sort_pages_without_overlap(self):
+        self.assertEqual(self.load_all("rating"), [5, 4, 3, 2, 1])
+
+    def test_recent_sort_pages_newest_first(self):
+        self.assertEqual(self.load_all("recent"), [2, 4, 1, 5, 3])
+
+    def test_json_includes_rendered_cards(self):
+        url = reverse("product_reviews_json", kwargs={"id": self.p.id})
+        data = self.client.get(url, {"sort": "useful"}).json()
+        self.assertEqual(data["html"].count("review-card"), 2)
+
+
+class PurchasedProductsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="u1", password="pass1234")
+        self.p1 = Product.objects.create(name="P1", price=10, image="products/a.jpg")
+        self.p2 = Product.objects.create(name="P2", price=10, image="products/b.jpg")
+        order = Order.objects.create(user=self.user)
+        ProductOrder.objects.create(order=order, product=self.p1)
+
+    def test_set_is_cached_between_requests(self):
+        self.assertEqual(purchased_product_ids(self.user), {self.p1.id})
+        user = User.objects.get(pk=self.user.pk)  # como en un request nuevo
+        with self.assertNumQueries(0):
+            self.assertTrue(user_purchased_product(user, self.p1))
+            self.assertFalse(user_purchased_product(user, self.p2))
+
+    def test_new_order_invalidates_set(self):
+        purchased_product_ids(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(user=self.user)
+            ProductOrder.objects.create(order=order, product=self.p2)
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(purchased_product_ids(user), {self.p1.id, self.p2.id})
+
+    def test_shop_grid_shows_badge(self):
+        self.client.login(username="u1", password="pass1234")
+        response = self.client.get(reverse("shop"))
+        self.assertEqual(response.context["purchased_ids"], {self.p1.id})
+        self.assertContains(response, "You bought this", count=1)
@@ -1,7 +1,59 @@
+from django.core.cache import cache
+from django.db import transaction
+
 from orders.models import Order, ProductOrder
 
+PURCHASED_TIMEOUT = 60 * 60 * 24
 
-def user_purchased_product(user, product):
+
+def _purchased_key(user_id):
+    return f"reviews:purchased:{user_id}"
+
+
+def purchased_product_ids(user):
+    """
+    frozenset con los ids de productos que el usuario compró.
+
+    Se carga una vez (una consulta) y queda en el caché hasta que cambie
+    alguna de sus órdenes (ver signals.py); dentro del request además se
+    guarda en el propio objeto user. Sirve para revisar cualquier cantidad
+    de productos con una sola búsqueda, p. ej. las insignias de la tienda.
+    """
     if not user.is_authenticated:
-        return False
-    return ProductOrder.objects.filter(order__user=user, product=product).exists()
+        return frozenset()
+    ids = getattr(user, "_purchased_product_ids", None)
+    if ids is None:
+        key = _purchased_key(user.pk)
+        ids = cache.get(key)
+        if ids is None:
+            ids = frozenset(
+                ProductOrder.objects.filter(order__user=user)
+                .values_list("product_id", flat=True)
+                .distinct()
+            )
+            cache.set(key, ids, PURCHASED_TIMEOUT)
+        user._purchased_product_ids = ids
+    return ids
+
+
+def user_purchased_product(user, product):
+    return getattr(product, "pk", product) in purchased_product_ids(user)
+
+
+def invalidate_purchased_products(user_id):
+    """
+    Borra el set del usuario ya y otra vez al confirmar la transacción, para
+    que una lectura hecha antes del commit no deje el set viejo en caché.
+    """
+    if user_id is None:
+        return
+    key = _purchased_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def invalidate_order_purchases(order_id):
+    user_id = (
+        Order.objects.filter(pk=order_id).values_list("user_id", flat=True).first()
+    )
+    invalidate_purchased_products(user_id)
@@ -5,6 +5,7 @@ from django.urls import reverse
 from django.views.generic import CreateView, View
 from django.db.models import F
 from django.utils.translation import gettext_lazy as _  # <-- NUEVO
+from shop.catalog import bump_catalog_version
 from shop.models import Product
 from .forms import ReviewForm
 from .models import Review
@@ -61,5 +62,6 @@ class MarkReviewUsefulView(LoginRequiredMixin, View):
     def post(self, request, pk):
         review = get_object_or_404(Review, pk=pk)
         Review.objects.filter(pk=pk).update(useful_count=F("useful_count") + 1)
+        bump_catalog_version()  # el contador se muestra en el detalle
         messages.success(request, _("Thanks for your feedback!"))  # <-- trans
         return redirect(reverse("product_detail", kwargs={"id": review.product_id}))
@@ -2,9 +2,11 @@ from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from services.browsing_app.models import BrowsingHistory
-from shop.models import Product
+from django.core.cache import cache
+from shop.models import DailyMetrics, Product, RollupCursor
 from orders.models import Order, ProductOrder
 from services.reviews_app.models import Review
+from shop.rollups import refresh_rollups
 from datetime import datetime, timedelta, date
 
 class ReportsTests(TestCase):
@@ -32,3 +34,70 @@ class ReportsTests(TestCase):
         self.assertIn("labels", data)
         self.assertIn("visits", data)
         self.assertIn("purchases", data)
+
+
+class ReportsRollupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.admin = User.objects.create_user("admin", "a@a.com", "pass", is_staff=True)
+        self.client.force_login(self.admin)
+        self.p = Product.objects.create(name="P1", price=10.0, brand="B")
+
+    def _view(self):
+        BrowsingHistory.objects.create(action="product_view", product_id=self.p.id)
+
+    def test_reports_fold_at_most_once_per_interval(self):
+        self._view()
+        data = self.client.get(reverse("admin_reports_data_json"), {"days": 1}).json()
+        self.assertEqual(data["visits"], [1])
+
+        self._view()
+        data = self.client.get(reverse("admin_reports_data_json"), {"days": 1}).json()
+        self.assertEqual(data["visits"], [1])  # dentro del intervalo solo lee
+        self.assertTrue(RollupCursor.objects.exists())
+
+        cache.clear()  # venció el intervalo
+        data = self.client.get(reverse("admin_reports_data_json"), {"days": 1}).json()
+        self.assertEqual(data["visits"], [2])
+
+    def test_new_rows_are_folded_incrementally(self):
+        self._view()
+        refresh_rollups()
+        data = self.client.get(reverse("admin_reports_data_json"), {"days": 1}).json()
+        self.assertEqual(data["visits"], [1])
+
+        self._view()
+        order = Order.objects.create(user=self.admin)
+        ProductOrder.objects.create(order=order, product=self.p, quantity=3)
+        Review.objects.create(product=self.p, user=self.admin, rating=4)
+        refresh_rollups()
+        data = self.client.get(reverse("admin_reports_data_json"), {"days": 1}).json()
+        self.assertEqual(data["visits"], [2])
+        self.assertEqual(data["purchases"], [1])
+        self.assertEqual(data["avg_ratings"], [4.0])
+        self.assertEqual(DailyMetrics.objects.get().visits, 2)
+
+    def test_visits_sum_sample_weights(self):
+        BrowsingHistory.objects.create(
+            action="product_view", product_id=self.p.id, sample_weight=10
+        )
+        refresh_rollups()
+        data = self.client.get(reverse("admin_reports_data_json"), {"days": 1}).json()
+        self.assertEqual(data["visits"], [10])
+        top = self.client.get(reverse("admin_top_products_json")).json()
+        self.assertEqual(top["top_viewed"][0]["views"], 10)
+
+    def test_top_and_csv_read_rollups(self):
+        self._view()
+        order = Order.objects.create(user=self.admin)
+        ProductOrder.objects.create(order=order, product=self.p, quantity=3)
+        refresh_rollups()
+
+        top = self.client.get(reverse("admin_reports_top_json")).json()
+        self.assertEqual(top["top_viewed"][0]["views"], 1)
+        self.assertEqual(top["top_bought"][0]["qty"], 3)
+
+        resp = self.client.get(reverse("admin_reports_export_csv"), {"days": 1})
+        rows = resp.content.decode().splitlines()
+        self.assertEqual(rows[1].split(",")[1:], ["1", "1"])
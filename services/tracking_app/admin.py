@@ -7,4 +7,4 @@ from .models import Event
 class EventAdmin(admin.ModelAdmin):
     list_display = ("event_type", "user", "product_id", "path", "created_at")
     list_filter = ("event_type", "created_at")
-    search_fields = ("path",)
+    search_fields = ("path", "visitor_id")
@@ -8,4 +8,4 @@ class TrackingAppConfig(AppConfig):
 
     def ready(self):
         # Asegura el registro de señales en runtime
-        from . import signals  # noqa: F401
+        from . import buffer, trending  # noqa: F401
@@ -0,0 +1,108 @@
+import asyncio
+import atexit
+import logging
+
+from asgiref.sync import sync_to_async
+
+from .buffer import buffer_setting, event_buffer
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncEventWriter:
+    """
+    Escritor de tracking para el modo ASGI.
+
+    - put() solo hace put_nowait en una asyncio.Queue acotada (MAX_PENDING):
+      el request nunca espera ni cambia de hilo por el tracking.
+    - Si la cola está llena la fila se descarta y se cuenta (backpressure:
+      se pierde analítica, no latencia).
+    - Una tarea del event loop pasa las filas al EventBuffer y hace el flush
+      con sync_to_async solo cuando toca (FLUSH_SIZE o FLUSH_INTERVAL), así
+      hay un salto de hilo por lote y no uno por request.
+    - Al apagar el proceso lo que quedó en la cola pasa al EventBuffer y se
+      escribe (atexit): Django no implementa el lifespan de ASGI.
+    """
+
+    def __init__(self):
+        self._queue = None
+        self._task = None
+        self._loop = None
+        self.dropped = 0
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._task is not None and not self._task.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=buffer_setting("MAX_PENDING"))
+        self._task = loop.create_task(self._run())
+
+    def put(self, row):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        return True
+
+    def _move_queued(self):
+        while not self._queue.empty():
+            event_buffer.add(self._queue.get_nowait())
+
+    async def _run(self):
+        interval = buffer_setting("FLUSH_INTERVAL")
+        while True:
+            try:
+                row = await asyncio.wait_for(self._queue.get(), timeout=interval)
+                event_buffer.add(row)
+                self._move_queued()
+            except asyncio.TimeoutError:
+                pass
+            if event_buffer.is_due():
+                try:
+                    await sync_to_async(event_buffer.flush)()
+                except Exception:
+                    logger.exception("Flush asíncrono del buffer de eventos falló")
+
+    async def drain(self):
+        """Escribe todo lo encolado (apagado ordenado y pruebas)."""
+        if self._queue is not None:
+            self._move_queued()
+        await sync_to_async(event_buffer.flush)()
+
+    def drain_on_exit(self):
+        """Versión síncrona de drain() para cuando el event loop ya terminó."""
+        if self._queue is not None:
+            self._move_queued()
+        event_buffer.flush()
+
+    async def close(self):
+        await self.drain()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = self._queue = self._loop = None
+
+    def stats(self):
+        return {
+            "async_queued": self._queue.qsize() if self._queue is not None else 0,
+            "async_dropped": self.dropped,
+        }
+
+
+async_writer = AsyncEventWriter()
+
+
+def _drain_on_exit():
+    try:
+        async_writer.drain_on_exit()
+    except Exception:
+        logger.exception("Vaciado final de la cola de tracking falló")
+
+
+atexit.register(_drain_on_exit)
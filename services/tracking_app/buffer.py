@@ -0,0 +1,136 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DatabaseError, transaction
+from django.dispatch import receiver
+
+from .spool import spool_enabled, spool_writer
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "FLUSH_SIZE": 50,  # filas pendientes que disparan un flush
+    "FLUSH_INTERVAL": 5.0,  # segundos máximos entre flushes
+    "MAX_PENDING": 5000,  # por encima de esto se descartan filas nuevas
+}
+
+
+def buffer_setting(name):
+    """Lee settings.TRACKING_BUFFER con valores por defecto."""
+    return getattr(settings, "TRACKING_BUFFER", {}).get(name, DEFAULTS[name])
+
+
+class EventBuffer:
+    """
+    Buffer en memoria para filas de tracking (instancias sin guardar).
+
+    - add() solo encola; nunca toca la base de datos.
+    - flush_if_due() escribe con bulk_create cuando se alcanza FLUSH_SIZE
+      o pasó FLUSH_INTERVAL desde el último flush. Se llama al terminar
+      cada request (request_finished), es decir, después de enviar la
+      respuesta al cliente.
+    - flush() vacía todo; se llama también al apagar el worker (atexit).
+    - Con TRACKING_SPOOL["ENABLED"] las filas van a segmentos JSONL en disco
+      y se cargan después con "manage.py load_events" (ver spool.py).
+    - Si hay más de MAX_PENDING filas pendientes, las nuevas se descartan.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_seconds = 0.0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, obj):
+        with self._lock:
+            if len(self._pending) >= buffer_setting("MAX_PENDING"):
+                self.dropped += 1
+                return False
+            self._pending.append(obj)
+        return True
+
+    def is_due(self):
+        if not self._pending:
+            return False
+        if len(self._pending) >= buffer_setting("FLUSH_SIZE"):
+            return True
+        elapsed = time.monotonic() - self._last_flush
+        return elapsed >= buffer_setting("FLUSH_INTERVAL")
+
+    def flush_if_due(self):
+        if self.is_due():
+            return self.flush()
+        return 0
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        if not batch:
+            return 0
+
+        started = time.monotonic()
+        try:
+            if spool_enabled():
+                spool_writer.write(batch)
+            else:
+                self._write_db(batch)
+        except (DatabaseError, OSError):
+            logger.exception("No se pudieron escribir %d eventos", len(batch))
+            with self._lock:
+                self.failed += len(batch)
+            return 0
+
+        with self._lock:
+            self.flushed += len(batch)
+            self.flushes += 1
+            self.last_flush_seconds = time.monotonic() - started
+        return len(batch)
+
+    def _write_db(self, batch):
+        # Agrupar por modelo para un bulk_create por tabla
+        by_model = {}
+        for obj in batch:
+            by_model.setdefault(type(obj), []).append(obj)
+        with transaction.atomic():
+            for model, objs in by_model.items():
+                model.objects.bulk_create(objs, batch_size=buffer_setting("FLUSH_SIZE"))
+
+    def stats(self):
+        return {
+            "pending": len(self._pending),
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "last_flush_seconds": round(self.last_flush_seconds, 4),
+        }
+
+
+event_buffer = EventBuffer()
+
+
+@receiver(request_finished, dispatch_uid="tracking_flush_event_buffer")
+def flush_event_buffer(sender, **kwargs):
+    event_buffer.flush_if_due()
+
+
+def _flush_on_exit():
+    try:
+        event_buffer.flush()
+    except Exception:
+        logger.exception("Flush final del buffer de eventos falló")
+
+
+atexit.register(_flush_on_exit)
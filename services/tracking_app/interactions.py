@@ -0,0 +1,161 @@
+from django.utils import timezone
+
+from services.browsing_app.models import BrowsingHistory
+
+from .buffer import event_buffer
+from .models import Event
+from .sampling import sample
+from .trending import trending
+from .visitor import get_visitor_id
+
+# url_name -> tipo de interacción. Solo estas vistas se registran como
+# visitas; el resto solo registra clics (?clicked=1).
+TRACKED_VIEWS = {
+    "shop": "shop_view",
+    "product_detail": "product_view",
+}
+
+# Parámetros del querystring que cuentan como búsqueda / filtro
+SEARCH_KEYS = {
+    "q",
+    "query",
+    "name",
+    "brand",
+    "type",
+    "min_price",
+    "max_price",
+    "category",
+}
+
+
+class Interaction:
+    """
+    Registro canónico de una interacción: uno por request.
+
+    Se proyecta a las dos tablas de analítica:
+    - Event (tracking_app): 'view' y/o 'click'
+    - BrowsingHistory (browsing_app): 'product_view' o 'search'
+    """
+
+    def __init__(
+        self,
+        kind,
+        path,
+        method="GET",
+        user=None,
+        session_key=None,
+        visitor_id=None,
+        product_id=None,
+        query=None,
+        clicked=False,
+        created_at=None,
+    ):
+        self.kind = kind  # 'shop_view' | 'product_view' | 'search' | None
+        self.path = path
+        self.method = method
+        self.user = user
+        self.session_key = session_key
+        self.visitor_id = visitor_id
+        self.product_id = product_id
+        self.query = query
+        self.clicked = clicked
+        self.created_at = created_at or timezone.now()
+
+    def _event(self, event_type):
+        return Event(
+            user=self.user,
+            session_key=self.session_key,
+            visitor_id=self.visitor_id,
+            event_type=event_type,
+            product_id=self.product_id,
+            path=self.path,
+            metadata={"method": self.method},
+            created_at=self.created_at,
+        )
+
+    def _browsing(self, action, **extra):
+        return BrowsingHistory(
+            user=self.user,
+            session_key=self.session_key,
+            visitor_id=self.visitor_id,
+            action=action,
+            path=self.path,
+            created_at=self.created_at,
+            **extra,
+        )
+
+    def rows(self):
+        rows = []
+        if self.kind:
+            rows.append(self._event("view"))
+        if self.clicked:
+            rows.append(self._event("click"))
+        if self.kind == "product_view":
+            rows.append(self._browsing("product_view", product_id=self.product_id))
+        elif self.kind == "search":
+            rows.append(self._browsing("search", query=self.query))
+        return rows
+
+
+def normalized_search_query(querydict):
+    """'name=foo&brand=bar' con solo los parámetros de búsqueda no vacíos."""
+    pairs = [(k, v) for k, v in querydict.items() if k in SEARCH_KEYS and v]
+    return "&".join(f"{k}={v}" for k, v in pairs)[:255]  # cabe en CharField(255)
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def classify(request, user):
+    """
+    Construye la Interaction del request usando el url_name resuelto.
+    Devuelve None si no hay nada que registrar. Recibe el usuario ya
+    resuelto para que el modo async no dispare consultas síncronas.
+    """
+    match = getattr(request, "resolver_match", None)
+    kind = TRACKED_VIEWS.get(match.url_name) if match else None
+    clicked = request.GET.get("clicked") == "1"
+    if not kind and not clicked:
+        return None
+
+    query = None
+    if kind == "shop_view":
+        query = normalized_search_query(request.GET)
+        if query:
+            kind = "search"
+
+    view_kwargs = match.kwargs if match else {}
+    product_id = (
+        request.GET.get("product_id") or view_kwargs.get("pk") or view_kwargs.get("id")
+    )
+    return Interaction(
+        kind=kind,
+        path=request.path,
+        method=request.method,
+        user=user if user is not None and user.is_authenticated else None,
+        # Solo existe si el carrito o el login ya crearon la sesión
+        session_key=request.session.session_key,
+        visitor_id=get_visitor_id(request),
+        product_id=_as_int(product_id),
+        query=query or None,
+        clicked=clicked,
+    )
+
+
+def record(interaction, add=event_buffer.add):
+    """
+    Encola las filas de la interacción; se escriben juntas en el flush.
+    En modo async `add` es async_writer.put. Las vistas de producto
+    alimentan las tendencias antes del muestreo. El muestreo es por
+    interacción: sus filas se guardan o descartan juntas y con el mismo peso.
+    """
+    if interaction.kind == "product_view" and interaction.product_id:
+        trending.add(interaction.product_id)
+    rows = interaction.rows()
+    if sample(*rows):
+        for row in rows:
+            add(row)
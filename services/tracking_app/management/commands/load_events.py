@@ -0,0 +1,88 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from services.tracking_app.models import SpoolOffset
+from services.tracking_app.spool import (
+    deserialize,
+    iter_segments,
+    read_lines,
+    spool_setting,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Carga los segmentos JSONL del spool de tracking en Event y "
+        "BrowsingHistory. Reanuda desde el offset guardado de cada segmento."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dir", help="Directorio del spool (por defecto TRACKING_SPOOL['DIR'])"
+        )
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--purge",
+            action="store_true",
+            help="Borra los segmentos ya cargados que ningún worker está escribiendo",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        total_rows = 0
+        total_bad = 0
+
+        for path in iter_segments(options["dir"]):
+            rows, bad = self._load_segment(path, chunk_size)
+            total_rows += rows
+            total_bad += bad
+            if rows or bad:
+                self.stdout.write(
+                    f"{path.name}: {rows} filas cargadas, {bad} inválidas"
+                )
+            if options["purge"]:
+                self._purge(path)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Cargadas {total_rows} filas ({total_bad} inválidas)")
+        )
+
+    def _load_segment(self, path, chunk_size):
+        state, _ = SpoolOffset.objects.get_or_create(segment=path.name)
+        loaded = bad = 0
+        with open(path, "rb") as fh:
+            fh.seek(state.offset)
+            while True:
+                lines, offset = read_lines(fh, chunk_size)
+                if offset == state.offset:
+                    break
+
+                by_model = {}
+                for line in lines:
+                    try:
+                        obj = deserialize(line)
+                    except Exception as exc:
+                        bad += 1
+                        self.stderr.write(f"{path.name}: línea inválida ({exc})")
+                        continue
+                    by_model.setdefault(type(obj), []).append(obj)
+
+                # Filas y offset en la misma transacción: si el proceso se
+                # corta, la próxima pasada reanuda sin duplicar ni perder filas.
+                with transaction.atomic():
+                    for model, objs in by_model.items():
+                        model.objects.bulk_create(objs, batch_size=chunk_size)
+                    SpoolOffset.objects.filter(pk=state.pk).update(offset=offset)
+                state.offset = offset
+                loaded += sum(len(objs) for objs in by_model.values())
+        return loaded, bad
+
+    def _purge(self, path):
+        state = SpoolOffset.objects.filter(segment=path.name).first()
+        idle = time.time() - path.stat().st_mtime > spool_setting("SEGMENT_MAX_AGE")
+        if state and idle and state.offset >= path.stat().st_size:
+            path.unlink()
+            state.delete()
+            self.stdout.write(f"{path.name}: eliminado")
@@ -0,0 +1,135 @@
+import gzip
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from services.tracking_app.spool import serialize
+
+DEFAULT_POLICIES = {
+    "tracking_app.Event": 90,
+    "browsing_app.BrowsingHistory": 90,
+}
+
+
+def retention_setting(name, default):
+    return getattr(settings, "TRACKING_RETENTION", {}).get(name, default)
+
+
+class Command(BaseCommand):
+    help = (
+        "Archiva en .jsonl.gz por día y borra en bloques las filas de tracking "
+        "más viejas que la política de retención de cada tabla."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=None)
+        parser.add_argument("--archive-dir", default=None)
+        parser.add_argument(
+            "--no-archive", action="store_true", help="Borra sin exportar"
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Solo cuenta las filas a borrar"
+        )
+        parser.add_argument(
+            "--vacuum",
+            action="store_true",
+            help="Ejecuta VACUUM al final para devolver el espacio al disco (SQLite)",
+        )
+
+    def handle(self, *args, **options):
+        policies = retention_setting("POLICIES", DEFAULT_POLICIES)
+        chunk_size = options["chunk_size"] or retention_setting("CHUNK_SIZE", 500)
+        archive_dir = Path(
+            options["archive_dir"]
+            or retention_setting("ARCHIVE_DIR", settings.BASE_DIR / "archive")
+        )
+
+        if not options["dry_run"]:
+            # Acumular en los rollups lo que aún no se contó antes de borrarlo
+            from shop.rollups import refresh_rollups
+
+            refresh_rollups()
+
+        space_before = self._sqlite_space()
+        for label, days in policies.items():
+            try:
+                model = apps.get_model(label)
+            except LookupError as exc:
+                raise CommandError(
+                    f"Modelo desconocido en la política: {label}"
+                ) from exc
+            cutoff = timezone.now() - timedelta(days=days)
+            expired = model.objects.filter(created_at__lt=cutoff)
+
+            if options["dry_run"]:
+                self.stdout.write(
+                    f"{label}: {expired.count()} filas anteriores a {cutoff:%Y-%m-%d}"
+                )
+                continue
+
+            deleted = 0
+            while True:
+                # Bloques cortos: cada DELETE toma el lock de escritura poco tiempo
+                ids = list(
+                    expired.order_by("pk").values_list("pk", flat=True)[:chunk_size]
+                )
+                if not ids:
+                    break
+                rows = model.objects.filter(pk__in=ids).order_by("pk")
+                if not options["no_archive"]:
+                    self._archive(archive_dir / model._meta.label_lower, rows)
+                with transaction.atomic():
+                    deleted += model.objects.filter(pk__in=ids).delete()[0]
+            self.stdout.write(
+                f"{label}: {deleted} filas eliminadas (retención {days} días)"
+            )
+
+        if options["dry_run"]:
+            return
+
+        if options["vacuum"] and connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("VACUUM")
+        self._report_space(space_before, self._sqlite_space())
+
+    def _archive(self, directory, rows):
+        """Agrega las filas a un archivo comprimido por día de creación."""
+        directory.mkdir(parents=True, exist_ok=True)
+        by_day = {}
+        for row in rows:
+            day = timezone.localtime(row.created_at).date().isoformat()
+            by_day.setdefault(day, []).append(serialize(row))
+        for day, lines in by_day.items():
+            # gzip en modo "a" agrega un miembro nuevo; se lee como un solo archivo
+            with gzip.open(directory / f"{day}.jsonl.gz", "at", encoding="utf-8") as fh:
+                fh.write("\n".join(lines) + "\n")
+
+    def _sqlite_space(self):
+        if connection.vendor != "sqlite":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA page_size")
+            page_size = cursor.fetchone()[0]
+            cursor.execute("PRAGMA page_count")
+            pages = cursor.fetchone()[0]
+            cursor.execute("PRAGMA freelist_count")
+            free = cursor.fetchone()[0]
+        db_file = settings.DATABASES["default"]["NAME"]
+        file_size = os.path.getsize(db_file) if os.path.exists(str(db_file)) else None
+        return {"used": (pages - free) * page_size, "file": file_size}
+
+    def _report_space(self, before, after):
+        if not before or not after:
+            return
+        reclaimed = before["used"] - after["used"]
+        msg = f"Espacio liberado dentro de la BD: {reclaimed / 1024:.1f} KiB"
+        if before["file"] is not None and after["file"] is not None:
+            shrunk = before["file"] - after["file"]
+            msg += f"; archivo reducido en {shrunk / 1024:.1f} KiB"
+        self.stdout.write(self.style.SUCCESS(msg))
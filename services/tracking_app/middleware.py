@@ -1,46 +1,57 @@
-from django.utils.deprecation import MiddlewareMixin
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.functional import empty
 
-from .models import Event
+from .async_writer import async_writer
+from .interactions import classify, record
+from .visitor import set_visitor_cookie
 
 
-class UserInteractionMiddleware(MiddlewareMixin):
+async def _auser(request):
+    """Usuario del request sin consultas síncronas en el event loop."""
+    user = getattr(request, "user", None)
+    # Si la vista ya resolvió request.user se reutiliza
+    wrapped = getattr(user, "_wrapped", empty)
+    if wrapped is not empty:
+        return wrapped
+    return await request.auser()
+
+
+class UserInteractionMiddleware:
     """
-    Registra vistas y clics:
-    - Cualquier path que empiece por /shop se considera vista de producto.
-    - Si llega ?clicked=1, registra un clic.
-    Ajusta los prefijos a tus URLs reales si no usas /shop.
+    Único punto de registro de interacciones (vistas, búsquedas y clics).
+
+    - Clasifica el request una sola vez por url_name (ver interactions.py),
+      después de la vista, con request.resolver_match.
+    - Genera un registro canónico y lo proyecta a Event y BrowsingHistory.
+    - WSGI: las filas van al buffer de tracking y se escriben juntas con
+      bulk_create al terminar el request (ver buffer.py).
+    - ASGI: el middleware corre como corrutina y entrega las filas al
+      escritor asyncio (ver async_writer.py), sin saltos de hilo por request.
+    - Los anónimos se identifican con una cookie firmada (ver visitor.py);
+      no se crea una sesión en BD solo para el tracking.
     """
 
-    def process_view(self, request, view_func, view_args, view_kwargs):
-        # Asegurar session para usuarios anónimos
-        if not request.session.session_key:
-            request.session.save()
-
-        path = request.path
-        product_id = (
-            request.GET.get("product_id")
-            or view_kwargs.get("pk")
-            or view_kwargs.get("id")
-        )
-        session_key = request.session.session_key
-
-        if path.startswith("/shop"):
-            Event.objects.create(
-                user=request.user if request.user.is_authenticated else None,
-                session_key=session_key,
-                event_type="view",
-                product_id=product_id if product_id else None,
-                path=path,
-                metadata={"method": request.method},
-            )
-
-        if request.GET.get("clicked") == "1":
-            Event.objects.create(
-                user=request.user if request.user.is_authenticated else None,
-                session_key=session_key,
-                event_type="click",
-                product_id=product_id if product_id else None,
-                path=path,
-                metadata={"method": request.method},
-            )
-        return None
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        interaction = classify(request, getattr(request, "user", None))
+        if interaction is not None:
+            record(interaction)
+        return set_visitor_cookie(request, response)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        interaction = classify(request, await _auser(request))
+        if interaction is not None:
+            record(interaction, add=async_writer.put)
+        return set_visitor_cookie(request, response)
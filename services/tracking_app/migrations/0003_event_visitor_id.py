@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracking_app", "0002_event_created_at_default"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="visitor_id",
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 13:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracking_app", "0004_spooloffset"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="sample_weight",
+            field=models.FloatField(default=1.0),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.6 on 2026-10-18 13:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0004_order_created_at_order_user"),
+        ("tracking_app", "0005_event_sample_weight"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="order",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="events",
+                to="orders.order",
+            ),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class Event(models.Model):
@@ -12,11 +13,25 @@ class Event(models.Model):
         settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL
     )
     session_key = models.CharField(max_length=40, null=True, blank=True)
+    # Cookie firmada de visitante (services/tracking_app/visitor.py)
+    visitor_id = models.CharField(max_length=32, null=True, blank=True)
     event_type = models.CharField(max_length=10, choices=EVENT_TYPES)
     product_id = models.IntegerField(null=True, blank=True)
+    # Solo en eventos 'purchase'
+    order = models.ForeignKey(
+        "orders.Order",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="events",
+    )
     path = models.CharField(max_length=255, blank=True)
     metadata = models.JSONField(default=dict, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # 1 / tasa de muestreo: los reportes suman este peso en vez de contar filas
+    sample_weight = models.FloatField(default=1.0)
+    # default en vez de auto_now_add: las filas se escriben por lotes y deben
+    # conservar la hora real del evento
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         indexes = [
@@ -25,5 +40,16 @@ class Event(models.Model):
         ]
 
     def __str__(self):
-        who = self.user_id or self.session_key
+        who = self.user_id or self.session_key or self.visitor_id
         return f"{self.event_type} - {who} - {self.product_id}"
+
+
+class SpoolOffset(models.Model):
+    """Bytes ya cargados de cada segmento JSONL del spool (load_events)."""
+
+    segment = models.CharField(max_length=255, unique=True)
+    offset = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.segment} @ {self.offset}"
@@ -0,0 +1,45 @@
+from .models import Event
+
+
+def _line_items(order):
+    """Líneas de la orden con precio unitario y subtotal, y el total."""
+    items = []
+    total = 0
+    for po in order.product_orders.select_related("product"):
+        subtotal = po.product.price * po.quantity
+        total += subtotal
+        items.append(
+            {
+                "product_id": po.product_id,
+                "name": po.product.name,
+                "quantity": po.quantity,
+                "unit_price": str(po.product.price),
+                "subtotal": str(subtotal),
+            }
+        )
+    return items, total
+
+
+def log_purchase(order):
+    """
+    Registra el evento 'purchase' de una orden ya confirmada, con sus líneas
+    y el total. Se escribe directo (sin buffer ni muestreo): cada compra
+    tiene que quedar registrada. Lo llama orders.checkout.place_order al
+    confirmar la transacción, cuando las líneas ya existen.
+    """
+    items, total = _line_items(order)
+    return Event.objects.create(
+        user=order.user,
+        session_key=None,
+        event_type="purchase",
+        order=order,
+        product_id=None,  # se documentan en metadata
+        path="orders:process_payment",
+        metadata={
+            "order_id": order.pk,
+            "status": order.status,
+            "products": items,
+            "items_count": sum(i["quantity"] for i in items),
+            "total": str(total),
+        },
+    )
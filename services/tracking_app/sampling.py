@@ -0,0 +1,68 @@
+import random
+
+from django.conf import settings
+
+from .buffer import event_buffer
+
+DEFAULTS = {
+    # Fracción de filas que se guardan por tipo (event_type o action)
+    "RATES": {},
+    # Tasas usadas en modo degradado (buffer lento o con mucha cola)
+    "DEGRADED_RATES": {"view": 0.1, "product_view": 0.1, "search": 0.5, "click": 0.5},
+    "MAX_FLUSH_SECONDS": 0.5,
+    "MAX_PENDING": 1000,
+}
+
+# Nunca se muestrean: cada compra tiene que quedar registrada
+NEVER_SAMPLED = {"purchase"}
+
+counters = {"sampled_out": 0}
+
+
+def sampling_setting(name):
+    return getattr(settings, "TRACKING_SAMPLING", {}).get(name, DEFAULTS[name])
+
+
+def is_degraded():
+    """Modo degradado: el último flush fue lento o la cola está muy llena."""
+    slow = event_buffer.last_flush_seconds > sampling_setting("MAX_FLUSH_SECONDS")
+    return slow or len(event_buffer) > sampling_setting("MAX_PENDING")
+
+
+def sample_rate(row_type, degraded=None):
+    if row_type in NEVER_SAMPLED:
+        return 1.0
+    rate = sampling_setting("RATES").get(row_type, 1.0)
+    if degraded is None:
+        degraded = is_degraded()
+    if degraded:
+        rate = min(rate, sampling_setting("DEGRADED_RATES").get(row_type, 1.0))
+    return rate
+
+
+def row_type(row):
+    return getattr(row, "event_type", None) or getattr(row, "action", None)
+
+
+def sample(*rows):
+    """
+    Decide una sola vez si se guardan las filas de una interacción, con la
+    menor de sus tasas. Si se guardan, todas llevan sample_weight = 1 / tasa
+    para que los reportes puedan sumar pesos y seguir siendo insesgados.
+    """
+    types = {row_type(row) for row in rows}
+    if types & NEVER_SAMPLED:
+        rate = 1.0
+    else:
+        degraded = is_degraded()
+        rate = min((sample_rate(t, degraded) for t in types), default=1.0)
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        counters["sampled_out"] += len(rows)
+        return False
+    for row in rows:
+        row.sample_weight = 1.0 / rate
+    return True
+
+
+def stats():
+    return {"sampled_out": counters["sampled_out"], "degraded": is_degraded()}
@@ -0,0 +1,131 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+DEFAULTS = {
+    "ENABLED": False,  # True: el buffer escribe a disco en vez de a la BD
+    "DIR": "spool/events",
+    "SEGMENT_MAX_BYTES": 8 * 1024 * 1024,
+    "SEGMENT_MAX_AGE": 300,  # segundos antes de rotar a un segmento nuevo
+}
+
+SEGMENT_GLOB = "events-*.jsonl"
+
+
+def spool_setting(name):
+    return getattr(settings, "TRACKING_SPOOL", {}).get(name, DEFAULTS[name])
+
+
+def spool_enabled():
+    return bool(spool_setting("ENABLED"))
+
+
+def spool_dir():
+    return Path(spool_setting("DIR"))
+
+
+class SpoolEncoder(DjangoJSONEncoder):
+    """Como DjangoJSONEncoder pero sin recortar los microsegundos."""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def serialize(obj):
+    """Instancia sin guardar -> línea JSONL (sin el pk)."""
+    fields = {
+        f.attname: f.value_from_object(obj)
+        for f in obj._meta.concrete_fields
+        if not f.primary_key
+    }
+    record = {"model": obj._meta.label_lower, "fields": fields}
+    return json.dumps(record, cls=SpoolEncoder, ensure_ascii=False)
+
+
+def deserialize(line):
+    """Línea JSONL -> instancia sin guardar del modelo correspondiente."""
+    record = json.loads(line)
+    model = apps.get_model(record["model"])
+    values = {}
+    for attname, value in record["fields"].items():
+        field = model._meta.get_field(attname)
+        values[field.attname] = field.to_python(value)
+    return model(**values)
+
+
+class SpoolWriter:
+    """
+    Escribe filas en segmentos JSONL de solo-anexado:
+    events-<fecha>-<pid>-<n>.jsonl. Rota el segmento por tamaño o edad.
+    Cada proceso escribe sus propios segmentos, así que no hay bloqueos
+    entre workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._path = None
+        self._opened_at = 0.0
+        self._seq = 0
+
+    def _needs_rotation(self):
+        if self._path is None or not self._path.exists():
+            return True
+        if self._path.stat().st_size >= spool_setting("SEGMENT_MAX_BYTES"):
+            return True
+        return time.monotonic() - self._opened_at >= spool_setting("SEGMENT_MAX_AGE")
+
+    def _rotate(self):
+        directory = spool_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        self._seq += 1
+        stamp = timezone.now().strftime("%Y%m%dT%H%M%S")
+        self._path = directory / f"events-{stamp}-{os.getpid()}-{self._seq}.jsonl"
+        self._opened_at = time.monotonic()
+
+    def write(self, objs):
+        lines = "".join(serialize(obj) + "\n" for obj in objs)
+        with self._lock:
+            if self._needs_rotation():
+                self._rotate()
+            with open(self._path, "a", encoding="utf-8") as fh:
+                fh.write(lines)
+        return len(objs)
+
+
+spool_writer = SpoolWriter()
+
+
+def iter_segments(directory=None):
+    directory = Path(directory) if directory else spool_dir()
+    if not directory.exists():
+        return []
+    return sorted(directory.glob(SEGMENT_GLOB))
+
+
+def read_lines(fh, limit):
+    """
+    Lee hasta `limit` líneas completas desde la posición actual.
+    Una línea sin '\\n' final es un segmento que aún se está escribiendo:
+    se deja para la próxima pasada. Devuelve (líneas, nuevo offset).
+    """
+    lines = []
+    offset = fh.tell()
+    while len(lines) < limit:
+        raw = fh.readline()
+        if not raw or not raw.endswith(b"\n"):
+            fh.seek(offset)
+            break
+        offset += len(raw)
+        if raw.strip():
+            lines.append(raw.decode("utf-8"))
+    return lines, offset
@@ -1,7 +1,34 @@
+import asyncio
+import gzip
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from orders.checkout import place_order
+from orders.models import Order
+from services.browsing_app.models import BrowsingHistory
+from shop.cart import CartLine
+from shop.models import Product
 
+from . import sampling
+from .async_writer import async_writer
+from .buffer import EventBuffer, event_buffer
+from .middleware import UserInteractionMiddleware
 from .models import Event
+from .spool import serialize
+from .trending import TrendingEngine, TrendingSketch, trending
+from .visitor import COOKIE_NAME
 
 User = get_user_model()
 
@@ -20,3 +47,337 @@ class TrackingTests(TestCase):
     def test_logs_click(self):
         self.client.get("/shop/product/1/?clicked=1")
         self.assertTrue(Event.objects.filter(event_type="click").exists())
+
+
+@override_settings(
+    TRACKING_BUFFER={"FLUSH_SIZE": 3, "FLUSH_INTERVAL": 3600, "MAX_PENDING": 4}
+)
+class EventBufferTests(TestCase):
+    def setUp(self):
+        self.buffer = EventBuffer()
+
+    def _event(self):
+        return Event(event_type="view", path="/shop/")
+
+    def test_flushes_when_size_reached(self):
+        self.buffer.add(self._event())
+        self.buffer.add(self._event())
+        self.assertEqual(self.buffer.flush_if_due(), 0)
+        self.assertEqual(Event.objects.count(), 0)
+
+        self.buffer.add(self._event())
+        self.assertEqual(self.buffer.flush_if_due(), 3)
+        self.assertEqual(Event.objects.count(), 3)
+        self.assertEqual(self.buffer.stats()["flushed"], 3)
+
+    def test_drops_when_full(self):
+        for _ in range(5):
+            self.buffer.add(self._event())
+        stats = self.buffer.stats()
+        self.assertEqual(stats["pending"], 4)
+        self.assertEqual(stats["dropped"], 1)
+
+    @override_settings(
+        TRACKING_BUFFER={"FLUSH_SIZE": 3, "FLUSH_INTERVAL": 0, "MAX_PENDING": 4}
+    )
+    def test_flushes_when_interval_elapsed(self):
+        self.buffer.add(self._event())
+        self.assertEqual(self.buffer.flush_if_due(), 1)
+
+    def test_keeps_event_time(self):
+        created = timezone.now() - timedelta(minutes=5)
+        self.buffer.add(Event(event_type="view", path="/shop/", created_at=created))
+        self.buffer.flush()
+        self.assertEqual(Event.objects.get().created_at, created)
+
+
+class InteractionPipelineTests(TestCase):
+    def test_search_writes_one_row_per_table(self):
+        self.client.get("/shop/?name=foo")
+        self.assertEqual(Event.objects.filter(event_type="view").count(), 1)
+        self.assertEqual(
+            BrowsingHistory.objects.filter(action="search", query="name=foo").count(),
+            1,
+        )
+        self.assertEqual(BrowsingHistory.objects.count(), 1)
+
+    def test_product_detail_logged_once(self):
+        product = Product.objects.create(name="P", price=10)
+        self.client.get(f"/shop/product/{product.id}/")
+        event = Event.objects.get()
+        history = BrowsingHistory.objects.get()
+        self.assertEqual(event.product_id, product.id)
+        self.assertEqual(history.action, "product_view")
+        self.assertEqual(history.created_at, event.created_at)
+
+    def test_untracked_views_not_logged(self):
+        self.client.get("/cart/")
+        self.assertFalse(Event.objects.exists())
+        self.assertFalse(BrowsingHistory.objects.exists())
+
+
+class AsyncMiddlewareTests(TestCase):
+    def test_middleware_supports_both_modes(self):
+        async def get_response(request):
+            return None
+
+        self.assertFalse(iscoroutinefunction(UserInteractionMiddleware(lambda r: r)))
+        self.assertTrue(iscoroutinefunction(UserInteractionMiddleware(get_response)))
+
+    async def test_async_request_goes_through_writer(self):
+        try:
+            response = await self.async_client.get("/shop/?name=foo")
+            self.assertIn(COOKIE_NAME, response.cookies)
+            await async_writer.drain()
+        finally:
+            await async_writer.close()
+        self.assertEqual(
+            await BrowsingHistory.objects.filter(action="search").acount(), 1
+        )
+        self.assertEqual(await Event.objects.filter(event_type="view").acount(), 1)
+
+    def test_queued_rows_are_written_on_exit(self):
+        async def serve():
+            async_writer.put(Event(event_type="view", path="/shop/"))
+            async_writer.put(Event(event_type="click", path="/shop/"))
+
+        # El loop termina con las filas todavía en la cola
+        asyncio.run(serve())
+        self.addCleanup(setattr, async_writer, "_queue", None)
+        async_writer.drain_on_exit()
+        self.assertEqual(Event.objects.count(), 2)
+        self.assertEqual(async_writer.stats()["async_queued"], 0)
+
+    async def test_full_queue_drops_rows(self):
+        try:
+            with override_settings(TRACKING_BUFFER={"MAX_PENDING": 1}):
+                await async_writer.close()
+                self.assertTrue(async_writer.put(Event(event_type="view")))
+                self.assertFalse(async_writer.put(Event(event_type="view")))
+            self.assertEqual(async_writer.stats()["async_dropped"], 1)
+        finally:
+            async_writer.dropped = 0
+            await async_writer.close()
+
+
+class TrendingTests(TestCase):
+    def setUp(self):
+        trending.reset()
+
+    def test_views_decay_with_half_life(self):
+        sketch = TrendingSketch(capacity=10, half_life=60, now=0)
+        sketch.add(1, now=0)
+        sketch.add(2, now=60)
+        self.assertEqual([key for key, _ in sketch.top(now=60)], [2, 1])
+        self.assertAlmostEqual(dict(sketch.top(now=60))[1], 0.5)
+
+    def test_space_saving_replaces_smallest(self):
+        sketch = TrendingSketch(capacity=2, half_life=3600, now=0)
+        for key in (1, 1, 1, 2, 3):
+            sketch.add(key, now=0)
+        top = dict(sketch.top(now=0))
+        self.assertEqual(set(top), {1, 3})
+        self.assertAlmostEqual(top[3], 2.0)  # hereda la cuenta del reemplazado
+        self.assertEqual(sketch.errors[3], 1.0)
+
+    def test_checkpoint_survives_restart(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "trending.json"
+            with override_settings(TRACKING_TRENDING={"CHECKPOINT_PATH": path}):
+                engine = TrendingEngine()
+                engine.add(7)
+                self.assertTrue(engine.checkpoint())
+                restarted = TrendingEngine()
+                self.assertEqual([key for key, _ in restarted.top()], [7])
+
+    def test_restart_merges_every_worker_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "trending.json"
+            with override_settings(TRACKING_TRENDING={"CHECKPOINT_PATH": path}):
+                workers = [TrendingEngine(), TrendingEngine()]
+                workers[0].add(7)
+                workers[1].add(7)
+                workers[1].add(8)
+                for worker in workers:
+                    worker.checkpoint()
+                self.assertEqual(len(list(Path(tmp).glob("trending.*.json"))), 2)
+
+                restarted = TrendingEngine()
+                scores = dict(restarted.top())
+                self.assertAlmostEqual(scores[7], 2.0, places=3)
+                self.assertAlmostEqual(scores[8], 1.0, places=3)
+                # Lo recuperado no se vuelve a guardar: otro reinicio no duplica
+                restarted.checkpoint()
+                again = dict(TrendingEngine().top())
+                self.assertAlmostEqual(again[7], 2.0, places=3)
+
+    def test_product_views_feed_trending(self):
+        product = Product.objects.create(name="P", price=10, quantity=1)
+        self.client.get(f"/shop/product/{product.id}/")
+        self.client.get("/shop/?name=foo")
+        self.assertEqual([key for key, _ in trending.top()], [product.id])
+
+
+class VisitorCookieTests(TestCase):
+    def test_anonymous_hit_does_not_create_session(self):
+        resp = self.client.get("/shop/")
+        self.assertFalse(Session.objects.exists())
+        self.assertIn(COOKIE_NAME, resp.cookies)
+        event = Event.objects.get()
+        self.assertIsNone(event.session_key)
+        self.assertEqual(len(event.visitor_id), 32)
+
+    def test_visitor_id_is_reused(self):
+        self.client.get("/shop/")
+        resp = self.client.get("/shop/?name=tv")
+        self.assertNotIn(COOKIE_NAME, resp.cookies)
+        self.assertEqual(Event.objects.values("visitor_id").distinct().count(), 1)
+        self.assertEqual(
+            BrowsingHistory.objects.get().visitor_id,
+            Event.objects.first().visitor_id,
+        )
+
+    def test_tampered_cookie_is_replaced(self):
+        self.client.cookies[COOKIE_NAME] = "forged"
+        resp = self.client.get("/shop/")
+        self.assertIn(COOKIE_NAME, resp.cookies)
+        self.assertNotEqual(Event.objects.get().visitor_id, "forged")
+
+
+class SpoolTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        spool = {"ENABLED": True, "DIR": self.tmp.name}
+        self.override = override_settings(TRACKING_SPOOL=spool)
+        self.override.enable()
+        self.addCleanup(self.override.disable)
+
+    def test_spooled_events_are_loaded_once(self):
+        buffer = EventBuffer()
+        created = timezone.now() - timedelta(hours=1)
+        buffer.add(Event(event_type="view", path="/shop/", created_at=created))
+        buffer.add(BrowsingHistory(action="search", query="name=tv", path="/shop/"))
+        buffer.flush()
+        self.assertFalse(Event.objects.exists())
+
+        call_command("load_events", stdout=StringIO())
+        call_command("load_events", stdout=StringIO())
+        self.assertEqual(Event.objects.get().created_at, created)
+        self.assertEqual(BrowsingHistory.objects.get().query, "name=tv")
+
+    def test_incomplete_line_is_left_for_next_run(self):
+        segment = Path(self.tmp.name) / "events-20250101T000000-1-1.jsonl"
+        line = serialize(Event(event_type="click", path="/shop/"))
+        segment.write_text(line + "\n" + line[:10], encoding="utf-8")
+
+        call_command("load_events", stdout=StringIO())
+        self.assertEqual(Event.objects.count(), 1)
+
+        segment.write_text(line + "\n" + line + "\n", encoding="utf-8")
+        call_command("load_events", stdout=StringIO())
+        self.assertEqual(Event.objects.count(), 2)
+
+
+class PruneTrackingTests(TestCase):
+    def test_archives_and_deletes_old_rows_in_chunks(self):
+        old = timezone.now() - timedelta(days=120)
+        for _ in range(3):
+            Event.objects.create(event_type="view", path="/shop/", created_at=old)
+        BrowsingHistory.objects.create(action="search", query="q=tv", created_at=old)
+        recent = Event.objects.create(event_type="view", path="/shop/")
+
+        with tempfile.TemporaryDirectory() as archive:
+            out = StringIO()
+            call_command(
+                "prune_tracking", archive_dir=archive, chunk_size=2, stdout=out
+            )
+
+            self.assertEqual(list(Event.objects.all()), [recent])
+            self.assertFalse(BrowsingHistory.objects.exists())
+            self.assertIn("3 filas eliminadas", out.getvalue())
+
+            day = timezone.localtime(old).date().isoformat()
+            with gzip.open(
+                Path(archive) / "tracking_app.event" / f"{day}.jsonl.gz", "rt"
+            ) as fh:
+                self.assertEqual(len(fh.read().splitlines()), 3)
+
+    def test_dry_run_keeps_rows(self):
+        Event.objects.create(
+            event_type="view", created_at=timezone.now() - timedelta(days=120)
+        )
+        call_command("prune_tracking", dry_run=True, stdout=StringIO())
+        self.assertEqual(Event.objects.count(), 1)
+
+
+class SamplingTests(TestCase):
+    @override_settings(TRACKING_SAMPLING={"RATES": {"view": 0.0}})
+    def test_interaction_is_dropped_as_a_whole(self):
+        self.client.get("/shop/?name=tv")
+        self.assertFalse(Event.objects.exists())
+        self.assertFalse(BrowsingHistory.objects.exists())
+
+    @override_settings(TRACKING_SAMPLING={"RATES": {"view": 0.25}})
+    def test_rows_of_an_interaction_share_weight(self):
+        with mock.patch(
+            "services.tracking_app.sampling.random.random", return_value=0.1
+        ) as draw:
+            self.client.get("/shop/?name=tv")
+        draw.assert_called_once()
+        self.assertEqual(Event.objects.get().sample_weight, 4.0)
+        self.assertEqual(BrowsingHistory.objects.get().sample_weight, 4.0)
+
+    @override_settings(TRACKING_SAMPLING={"RATES": {"view": 0.25}})
+    def test_kept_rows_carry_inverse_weight(self):
+        with mock.patch(
+            "services.tracking_app.sampling.random.random", return_value=0.1
+        ):
+            self.client.get("/shop/")
+        self.assertEqual(Event.objects.get().sample_weight, 4.0)
+
+    @override_settings(TRACKING_SAMPLING={"RATES": {"purchase": 0.0}})
+    def test_purchases_are_never_sampled(self):
+        self.assertTrue(sampling.sample(Event(event_type="purchase")))
+
+    @override_settings(
+        TRACKING_SAMPLING={"MAX_PENDING": 0, "DEGRADED_RATES": {"view": 0.5}}
+    )
+    def test_degraded_mode_lowers_rate(self):
+        with mock.patch.object(event_buffer, "_pending", [Event()]):
+            self.assertTrue(sampling.is_degraded())
+            self.assertEqual(sampling.sample_rate("view"), 0.5)
+            self.assertEqual(sampling.sample_rate("click"), 1.0)
+
+
+class PurchaseEventTests(TestCase):
+    def setUp(self):
+        self.p1 = Product.objects.create(name="Phone", price=100, quantity=5)
+        self.p2 = Product.objects.create(name="Case", price=10, quantity=5)
+
+    def test_purchase_event_has_order_and_line_items(self):
+        session = self.client.session
+        session["cart_product_data"] = {str(self.p1.id): 1, str(self.p2.id): 3}
+        session.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("process_payment"))
+
+        event = Event.objects.get(event_type="purchase")
+        self.assertIsNotNone(event.order_id)
+        self.assertEqual(len(event.metadata["products"]), 2)
+        self.assertEqual(event.metadata["items_count"], 4)
+        self.assertEqual(Decimal(event.metadata["total"]), Decimal("130"))
+
+    def test_status_change_does_not_log_again(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = place_order([CartLine(self.p1, 1)])
+        order.status = "shipped"
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            order.save()
+        self.assertEqual(callbacks, [])
+        self.assertEqual(Event.objects.filter(order=order).count(), 1)
+
+    def test_order_without_lines_logs_nothing(self):
+        # Fuera de place_order no hay líneas que registrar
+        Order.objects.create()
+        self.assertFalse(Event.objects.filter(event_type="purchase").exists())
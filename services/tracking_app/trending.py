@@ -0,0 +1,255 @@
+"""
+Productos en tendencia calculados en memoria.
+
+TrendingSketch es un Space-Saving top-K con decaimiento exponencial:
+- Guarda como máximo CAPACITY contadores. Un producto nuevo con la tabla
+  llena reemplaza al de menor cuenta y hereda esa cuenta como error.
+- El decaimiento es "forward decay": cada vista suma e^((t - t0) / tau) en
+  vez de envejecer todos los contadores; al leer se multiplica por
+  e^(-(ahora - t0) / tau). Con HALF_LIFE segundos una vista vale la mitad.
+- top(n) solo lee el diccionario en memoria, sin base de datos.
+
+Cada worker tiene su propio sketch con las vistas que atendió. Lo guarda
+en su propio archivo junto a CHECKPOINT_PATH ("trending.<pid>-<inicio>.json",
+JSON, escritura atómica) cada CHECKPOINT_INTERVAL segundos al terminar un
+request y al apagar el proceso. Al arrancar suma los checkpoints de todos
+los workers en un sketch de solo lectura que no se vuelve a guardar: cada
+vista queda en un único archivo y no se cuenta dos veces. Los archivos sin
+cambios en STALE_HALF_LIVES vidas medias ya no pesan y se borran.
+"""
+
+import atexit
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "CAPACITY": 200,  # contadores en memoria (productos candidatos)
+    "HALF_LIFE": 3600,  # segundos
+    "CHECKPOINT_PATH": None,  # None: sin checkpoint en disco
+    "CHECKPOINT_INTERVAL": 60,  # segundos
+}
+
+# Cuando el factor de escala crece demasiado se re-normalizan los contadores
+MAX_SCALE_EXPONENT = 50
+
+# Tras 20 vidas medias una vista pesa menos de una millonésima
+STALE_HALF_LIVES = 20
+
+
+def trending_setting(name):
+    return getattr(settings, "TRACKING_TRENDING", {}).get(name, DEFAULTS[name])
+
+
+class TrendingSketch:
+    def __init__(self, capacity, half_life, now=None):
+        self.capacity = capacity
+        self.tau = half_life / math.log(2)
+        self.landmark = time.time() if now is None else now
+        self.counts = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def _renormalize(self, now):
+        factor = math.exp(-(now - self.landmark) / self.tau)
+        self.counts = {key: c * factor for key, c in self.counts.items()}
+        self.errors = {key: e * factor for key, e in self.errors.items()}
+        self.landmark = now
+
+    def add(self, key, weight=1.0, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            if (now - self.landmark) / self.tau > MAX_SCALE_EXPONENT:
+                self._renormalize(now)
+            increment = weight * math.exp((now - self.landmark) / self.tau)
+            if key in self.counts:
+                self.counts[key] += increment
+            elif len(self.counts) < self.capacity:
+                self.counts[key] = increment
+                self.errors[key] = 0.0
+            else:
+                victim = min(self.counts, key=self.counts.get)
+                floor = self.counts.pop(victim)
+                self.errors.pop(victim, None)
+                self.counts[key] = floor + increment
+                self.errors[key] = floor
+
+    def top(self, n=10, now=None):
+        """[(key, score)] de mayor a menor, con score en vistas decaídas."""
+        now = time.time() if now is None else now
+        factor = math.exp(-(now - self.landmark) / self.tau)
+        with self._lock:
+            items = sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)
+        return [(key, count * factor) for key, count in items[:n]]
+
+    def clear(self):
+        with self._lock:
+            self.counts = {}
+            self.errors = {}
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "landmark": self.landmark,
+                "counts": {str(k): v for k, v in self.counts.items()},
+                "errors": {str(k): v for k, v in self.errors.items()},
+            }
+
+    def load_dict(self, data):
+        with self._lock:
+            self.landmark = float(data["landmark"])
+            self.counts = {int(k): float(v) for k, v in data["counts"].items()}
+            self.errors = {int(k): float(v) for k, v in data["errors"].items()}
+            self._trim()
+
+    def merge_dict(self, data):
+        """Suma otro sketch (to_dict) llevándolo al landmark de este."""
+        factor = math.exp((float(data["landmark"]) - self.landmark) / self.tau)
+        with self._lock:
+            for k, v in data["counts"].items():
+                key = int(k)
+                self.counts[key] = self.counts.get(key, 0.0) + float(v) * factor
+                error = float(data["errors"].get(k, 0.0)) * factor
+                self.errors[key] = self.errors.get(key, 0.0) + error
+            self._trim()
+
+    def _trim(self):
+        while len(self.counts) > self.capacity:
+            victim = min(self.counts, key=self.counts.get)
+            self.counts.pop(victim)
+            self.errors.pop(victim, None)
+
+
+class TrendingEngine:
+    """
+    Sketch de las vistas de este worker, más lo recuperado al arrancar de
+    los checkpoints de todos los workers.
+    """
+
+    def __init__(self):
+        self._sketch = None
+        self._restored = None
+        # Único por proceso aunque el pid se repita entre reinicios
+        self._process = f"{os.getpid()}-{time.time_ns()}"
+        self._last_checkpoint = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _new_sketch(self):
+        return TrendingSketch(
+            trending_setting("CAPACITY"), trending_setting("HALF_LIFE")
+        )
+
+    @property
+    def sketch(self):
+        if self._sketch is None:
+            with self._lock:
+                if self._sketch is None:
+                    self._restored = self._restore()
+                    self._sketch = self._new_sketch()
+        return self._sketch
+
+    def _base_path(self):
+        path = trending_setting("CHECKPOINT_PATH")
+        return Path(path) if path else None
+
+    def _path(self):
+        """Checkpoint de este proceso: trending.json -> trending.<proceso>.json"""
+        base = self._base_path()
+        if base is None:
+            return None
+        return base.with_name(f"{base.stem}.{self._process}{base.suffix}")
+
+    def _checkpoint_files(self):
+        base = self._base_path()
+        if base is None or not base.parent.exists():
+            return []
+        files = list(base.parent.glob(f"{base.stem}.*{base.suffix}"))
+        if base.exists():  # checkpoint único de versiones anteriores
+            files.append(base)
+        return files
+
+    def _restore(self):
+        """Suma los checkpoints de todos los workers y borra los vencidos."""
+        restored = self._new_sketch()
+        stale_before = time.time() - STALE_HALF_LIVES * trending_setting("HALF_LIFE")
+        for path in self._checkpoint_files():
+            try:
+                if path.stat().st_mtime < stale_before:
+                    path.unlink()
+                    continue
+                restored.merge_dict(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError, KeyError):
+                logger.warning("Checkpoint de tendencias ilegible: %s", path)
+        return restored
+
+    def add(self, product_id, weight=1.0):
+        self.sketch.add(product_id, weight)
+
+    def top(self, n=10):
+        own = self.sketch.top(trending_setting("CAPACITY"))
+        scores = dict(self._restored.top(trending_setting("CAPACITY")))
+        for key, score in own:
+            scores[key] = scores.get(key, 0.0) + score
+        return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:n]
+
+    def checkpoint(self):
+        """
+        Escribe a disco solo las vistas de este worker (archivo temporal +
+        os.replace); lo recuperado ya está en los archivos de origen.
+        """
+        path = self._path()
+        self._last_checkpoint = time.monotonic()
+        if path is None or self._sketch is None:
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".trending-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(self._sketch.to_dict(), fh)
+            os.replace(tmp, path)
+        except OSError:
+            logger.exception("No se pudo guardar el checkpoint de tendencias")
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            return False
+        return True
+
+    def checkpoint_if_due(self):
+        elapsed = time.monotonic() - self._last_checkpoint
+        if elapsed >= trending_setting("CHECKPOINT_INTERVAL"):
+            return self.checkpoint()
+        return False
+
+    def reset(self):
+        """Descarta el estado en memoria; se recarga del checkpoint al usarse."""
+        self._sketch = None
+        self._restored = None
+
+
+trending = TrendingEngine()
+
+
+@receiver(request_finished, dispatch_uid="tracking_trending_checkpoint")
+def checkpoint_trending(sender, **kwargs):
+    trending.checkpoint_if_due()
+
+
+def _checkpoint_on_exit():
+    try:
+        trending.checkpoint()
+    except Exception:
+        logger.exception("Checkpoint final de tendencias falló")
+
+
+atexit.register(_checkpoint_on_exit)
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .views import tracking_stats_json
+
+urlpatterns = [
+    path("stats/", tracking_stats_json, name="tracking_stats_json"),
+]
@@ -1,3 +1,14 @@
-from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 
-# Create your views here.
+from . import sampling
+from .async_writer import async_writer
+from .buffer import event_buffer
+
+
+@staff_member_required
+def tracking_stats_json(request):
+    """Contadores del buffer de eventos y del muestreo de este worker."""
+    return JsonResponse(
+        {**event_buffer.stats(), **async_writer.stats(), **sampling.stats()}
+    )
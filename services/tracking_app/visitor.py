@@ -0,0 +1,38 @@
+import uuid
+
+from django.conf import settings
+
+COOKIE_NAME = getattr(settings, "TRACKING_VISITOR_COOKIE", "b4u_vid")
+COOKIE_SALT = "tracking.visitor"
+COOKIE_MAX_AGE = 60 * 60 * 24 * 365  # un año
+
+
+def get_visitor_id(request):
+    """
+    Identificador anónimo del visitante, leído de una cookie firmada.
+    Si no existe se genera uno nuevo (sin tocar la base de datos) y se marca
+    el request para que set_visitor_cookie lo envíe en la respuesta.
+    """
+    visitor_id = getattr(request, "visitor_id", None)
+    if visitor_id:
+        return visitor_id
+
+    visitor_id = request.get_signed_cookie(COOKIE_NAME, default=None, salt=COOKIE_SALT)
+    if not visitor_id:
+        visitor_id = uuid.uuid4().hex
+        request.new_visitor_id = True
+    request.visitor_id = visitor_id
+    return visitor_id
+
+
+def set_visitor_cookie(request, response):
+    if getattr(request, "new_visitor_id", False):
+        response.set_signed_cookie(
+            COOKIE_NAME,
+            request.visitor_id,
+            salt=COOKIE_SALT,
+            max_age=COOKIE_MAX_AGE,
+            httponly=True,
+            samesite="Lax",
+        )
+    return response
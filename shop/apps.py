@@ -1,6 +1,25 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def _ensure_search_index(sender, using, **kwargs):
+    from django.db import connections
+
+    from .search import ensure_search_index
+
+    ensure_search_index(connections[using])
 
 
 class ShopConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "shop"
+
+    def ready(self):
+        from . import catalog  # noqa: F401  (señales de versión del catálogo)
+        from . import counters  # noqa: F401  (flush del contador de carrito)
+        from . import images  # noqa: F401  (miniaturas al subir imágenes)
+
+        # Los triggers de FTS5 se pierden si una migración rehace shop_product
+        post_migrate.connect(
+            _ensure_search_index, sender=self, dispatch_uid="shop_search_index"
+        )
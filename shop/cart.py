@@ -0,0 +1,101 @@
+"""
+Carrito de la sesión con sus productos cargados en una sola consulta.
+
+La sesión guarda {"<product_id>": cantidad} bajo "cart_product_data". Cart
+lo lee una vez por request (Cart.for_request lo deja en el request), trae
+todos los productos con un in_bulk y calcula subtotales y stock en memoria,
+así el carrito, la pasarela de pago y el contador del header cuestan lo
+mismo con 1 o con 50 productos.
+"""
+
+from .models import Product
+
+SESSION_KEY = "cart_product_data"
+
+
+class CartLine:
+    def __init__(self, product, quantity):
+        self.product = product
+        self.quantity = quantity
+
+    @property
+    def subtotal(self):
+        return self.product.price * self.quantity
+
+    @property
+    def in_stock(self):
+        return self.product.quantity >= self.quantity
+
+
+class Cart:
+    def __init__(self, session):
+        self.session = session
+        self._lines = None
+
+    @classmethod
+    def for_request(cls, request):
+        cart = getattr(request, "_cart", None)
+        if cart is None:
+            cart = request._cart = cls(request.session)
+        return cart
+
+    @property
+    def data(self):
+        return self.session.get(SESSION_KEY, {})
+
+    def __len__(self):
+        """Cantidad de productos distintos; no consulta la base."""
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    @property
+    def lines(self):
+        if self._lines is None:
+            quantities = {}
+            for product_id, quantity in self.data.items():
+                try:
+                    quantities[int(product_id)] = int(quantity)
+                except (TypeError, ValueError):
+                    continue
+            products = Product.objects.in_bulk(list(quantities))
+            # Los productos borrados desde que se agregaron se ignoran
+            self._lines = [
+                CartLine(products[pk], quantity)
+                for pk, quantity in quantities.items()
+                if pk in products
+            ]
+        return self._lines
+
+    @property
+    def total(self):
+        return sum((line.subtotal for line in self.lines), 0)
+
+    def out_of_stock(self):
+        return [line for line in self.lines if not line.in_stock]
+
+    def _save(self, data):
+        self.session[SESSION_KEY] = data
+        self.session.modified = True
+        self._lines = None
+
+    def add(self, product_id, quantity=1):
+        data = self.data
+        key = str(product_id)
+        data[key] = data.get(key, 0) + quantity
+        self._save(data)
+
+    def set(self, product_id, quantity):
+        data = self.data
+        if quantity > 0:
+            data[str(product_id)] = quantity
+        else:
+            data.pop(str(product_id), None)
+        self._save(data)
+
+    def remove(self, product_id):
+        self.set(product_id, 0)
+
+    def clear(self):
+        self._save({})
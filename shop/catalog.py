@@ -0,0 +1,47 @@
+"""
+Versión del catálogo para invalidar cachés derivadas de Product.
+
+Cada save/delete de un producto incrementa la versión; las claves de caché
+que la incluyen (facetas, contexto del home, ETags, ...) quedan obsoletas
+sin tener que borrarlas una por una. Los update() masivos no disparan
+señales: quien los use debe llamar a bump_catalog_version(). También
+times_added_to_cart, porque ordena el catálogo por "popular"; el contador
+agrupado (counters.py) la sube una vez por flush, no por clic.
+
+Con el caché por defecto (LocMem) la versión es por proceso; en producción
+con varios workers conviene un caché compartido (CACHES en settings).
+"""
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Product
+
+CATALOG_VERSION_KEY = "shop:catalog_version"
+
+
+def catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, 1, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY, 1)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:  # la clave no existía (caché vacío o expulsada)
+        cache.set(CATALOG_VERSION_KEY, 2, timeout=None)
+        return 2
+
+
+@receiver(post_save, sender=Product, dispatch_uid="shop_catalog_version_save")
+def product_saved(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_delete, sender=Product, dispatch_uid="shop_catalog_version_delete")
+def product_deleted(sender, **kwargs):
+    bump_catalog_version()
@@ -0,0 +1,104 @@
+"""
+GET condicional (ETag / If-None-Match) para las páginas del catálogo y la API.
+
+El ETag se arma solo con datos que ya están en memoria o en el caché: la
+versión del catálogo (catalog.py), el idioma y, para páginas HTML, el
+usuario, la cantidad de ítems del carrito que muestra el header y el
+secreto CSRF (los formularios llevan {% csrf_token %}; al rotarlo en el
+login la página cacheada quedaría con un token viejo). Si el cliente manda
+el mismo ETag se responde 304 antes de ejecutar la vista, sin consultas ni
+render.
+
+Las páginas con mensajes pendientes (django.contrib.messages) no llevan
+ETag: el mensaje se consume al renderizar y un 304 lo perdería.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.utils import translation
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+from django.views.decorators.http import condition
+
+from .cart import Cart
+from .catalog import catalog_version
+
+
+def _digest(parts):
+    raw = "|".join(str(part) for part in parts)
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _has_pending_messages(request):
+    storage = getattr(request, "_messages", None)
+    # len() no marca los mensajes como leídos
+    return bool(storage is not None and len(storage))
+
+
+def page_etag(request, *extra):
+    """ETag de una página HTML, o None si no se puede cachear."""
+    if _has_pending_messages(request):
+        return None
+    user = getattr(request, "user", None)
+    user_id = user.pk if user is not None and user.is_authenticated else 0
+    return _digest(
+        [
+            "page",
+            catalog_version(),
+            translation.get_language(),
+            user_id,
+            len(Cart.for_request(request)),
+            request.META.get("CSRF_COOKIE", ""),
+            request.get_full_path(),
+            *extra,
+        ]
+    )
+
+
+def api_etag(request, *extra):
+    """ETag de la API pública: no depende del usuario ni de la sesión."""
+    return _digest(
+        [
+            "api",
+            catalog_version(),
+            translation.get_language(),
+            request.get_full_path(),
+            request.META.get("HTTP_ACCEPT", ""),
+            *extra,
+        ]
+    )
+
+
+def conditional_get(etag_func, private=True):
+    """
+    Decorador para el get() de una vista: responde 304 si el ETag coincide
+    y obliga a revalidar siempre (no-cache), así el navegador guarda la
+    página pero pregunta antes de usarla. Con private=False (API pública)
+    también pueden guardarla los cachés compartidos.
+    """
+    cached = condition(etag_func=lambda request, *args, **kwargs: etag_func(request))
+
+    def decorator(view):
+        conditional_view = cached(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            csrf_cookie = request.META.get("CSRF_COOKIE")
+            response = conditional_view(request, *args, **kwargs)
+            if response.has_header("ETag"):
+                # El render creó el secreto CSRF: el ETag tiene que incluirlo
+                if request.META.get("CSRF_COOKIE") != csrf_cookie:
+                    etag = etag_func(request)
+                    if etag:
+                        response["ETag"] = quote_etag(etag)
+                if private:
+                    patch_cache_control(response, no_cache=True, private=True)
+                    patch_vary_headers(response, ["Cookie"])
+                else:
+                    patch_cache_control(response, no_cache=True, public=True)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,141 @@
+"""
+Contador agrupado de Product.times_added_to_cart.
+
+Cada "agregar al carrito" solo suma en memoria; cada tanto los incrementos
+acumulados se escriben en un único UPDATE con CASE:
+
+    UPDATE shop_product
+    SET times_added_to_cart = CASE
+        WHEN id = 3 THEN times_added_to_cart + 7
+        WHEN id = 9 THEN times_added_to_cart + 2 ...
+    END
+    WHERE id IN (3, 9, ...)
+
+Así los clics no toman el lock de escritura de SQLite uno por uno ni
+compiten con el checkout. Igual que el buffer de eventos
+(services/tracking_app/buffer.py) se escribe al terminar un request cuando
+se juntan FLUSH_SIZE incrementos o pasó FLUSH_INTERVAL, y al apagar el
+worker. Los incrementos pendientes son por proceso: pending() permite
+sumarlos a lo leído de la base.
+"""
+
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DatabaseError
+from django.db.models import Case, F, PositiveIntegerField, When
+from django.dispatch import receiver
+
+from .catalog import bump_catalog_version
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "FLUSH_SIZE": 100,  # incrementos pendientes que disparan un flush
+    "FLUSH_INTERVAL": 10.0,  # segundos máximos entre flushes
+}
+
+
+def counter_setting(name):
+    return getattr(settings, "SHOP_CART_COUNTER", {}).get(name, DEFAULTS[name])
+
+
+class CartAddCounter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        # Suma de _pending, mantenida bajo el lock: is_due() no recorre el dict
+        self._total = 0
+        self._last_flush = time.monotonic()
+        self.flushes = 0
+        self.failed = 0
+
+    def __len__(self):
+        with self._lock:
+            return self._total
+
+    def add(self, product_id, count=1):
+        with self._lock:
+            self._pending[product_id] = self._pending.get(product_id, 0) + count
+            self._total += count
+
+    def pending(self):
+        with self._lock:
+            return dict(self._pending)
+
+    def reset(self):
+        """Descarta lo pendiente (tests)."""
+        with self._lock:
+            self._pending = {}
+            self._total = 0
+
+    def is_due(self):
+        with self._lock:
+            total, last_flush = self._total, self._last_flush
+        if not total:
+            return False
+        if total >= counter_setting("FLUSH_SIZE"):
+            return True
+        return time.monotonic() - last_flush >= counter_setting("FLUSH_INTERVAL")
+
+    def flush_if_due(self):
+        if self.is_due():
+            return self.flush()
+        return 0
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._total = 0
+            self._last_flush = time.monotonic()
+        if not batch:
+            return 0
+        whens = [
+            When(pk=product_id, then=F("times_added_to_cart") + count)
+            for product_id, count in batch.items()
+        ]
+        try:
+            Product.objects.filter(pk__in=batch).update(
+                times_added_to_cart=Case(
+                    *whens,
+                    default=F("times_added_to_cart"),
+                    output_field=PositiveIntegerField(),
+                )
+            )
+        except DatabaseError:
+            logger.exception("No se pudo escribir el contador de carrito")
+            # Se devuelven para el próximo flush
+            with self._lock:
+                for product_id, count in batch.items():
+                    self._pending[product_id] = self._pending.get(product_id, 0) + count
+                    self._total += count
+                self.failed += 1
+            return 0
+        with self._lock:
+            self.flushes += 1
+        # update() no dispara post_save; el orden "popular" cambió
+        bump_catalog_version()
+        return len(batch)
+
+
+cart_add_counter = CartAddCounter()
+
+
+@receiver(request_finished, dispatch_uid="shop_flush_cart_counter")
+def flush_cart_counter(sender, **kwargs):
+    cart_add_counter.flush_if_due()
+
+
+def _flush_on_exit():
+    try:
+        cart_add_counter.flush()
+    except Exception:
+        logger.exception("Flush final del contador de carrito falló")
+
+
+atexit.register(_flush_on_exit)
@@ -0,0 +1,84 @@
+"""
+Facetas de la tienda: conteos por tipo, marca y rango de precio.
+
+facet_counts() agrupa por (type, brand, rango) en una sola consulta y suma
+en Python cada dimensión. cached_facets() guarda el resultado por versión
+del catálogo y por filtros, así el sidebar muestra conteos sin consultas
+extra mientras nadie edite productos.
+"""
+
+import hashlib
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, IntegerField, Value, When
+
+from .catalog import catalog_version
+from .models import Product
+
+DEFAULT_PRICE_BUCKETS = [250, 500, 1000, 2000]
+CACHE_TIMEOUT = 300  # acota lo desactualizado con cachés por proceso
+
+
+def price_edges():
+    return list(getattr(settings, "SHOP_PRICE_BUCKETS", DEFAULT_PRICE_BUCKETS))
+
+
+def price_buckets():
+    """
+    [(índice, mínimo, máximo)] con None en los extremos abiertos. Cada rango
+    es [mínimo, máximo): un precio justo en el borde cae en el de arriba.
+    """
+    edges = [None, *price_edges(), None]
+    return [(i, edges[i], edges[i + 1]) for i in range(len(edges) - 1)]
+
+
+def _bucket_expression():
+    whens = [
+        When(price__lt=upper, then=Value(index))
+        for index, _, upper in price_buckets()
+        if upper is not None
+    ]
+    return Case(*whens, default=Value(len(whens)), output_field=IntegerField())
+
+
+def facet_counts(queryset):
+    rows = (
+        queryset.order_by()
+        .values("type", "brand", bucket=_bucket_expression())
+        .annotate(n=Count("id"))
+    )
+    types, brands, prices = Counter(), Counter(), Counter()
+    for row in rows:
+        types[row["type"]] += row["n"]
+        brands[row["brand"]] += row["n"]
+        prices[row["bucket"]] += row["n"]
+    return {
+        "total": sum(types.values()),
+        "type": sorted(types.items()),
+        "brand": sorted(brands.items()),
+        "price": [
+            {"min": low, "max": high, "count": prices[index]}
+            for index, low, high in price_buckets()
+        ],
+    }
+
+
+def _cache_key(params):
+    digest = hashlib.md5(repr(sorted(params.items())).encode()).hexdigest()
+    return f"shop:facets:{catalog_version()}:{digest}"
+
+
+def cached_facets(queryset, params=None):
+    """
+    Facetas de `queryset`. `params` son los filtros que lo definen (forman
+    la clave de caché); sin params se asume el catálogo completo.
+    """
+    return cache.get_or_set(
+        _cache_key(params or {}), lambda: facet_counts(queryset), CACHE_TIMEOUT
+    )
+
+
+def catalog_facets():
+    return cached_facets(Product.objects.all())
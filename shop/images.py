@@ -0,0 +1,135 @@
+"""
+Derivados de Product.image: miniaturas JPEG y WebP en varios anchos.
+
+Se guardan por hash del contenido, p. ej.
+    products/derived/3f/3fa9…c1-400.webp
+así que el nombre es determinista: volver a procesar la misma imagen no
+escribe nada, dos productos con la misma foto comparten archivos y, como el
+nombre cambia con el contenido, se pueden servir con caché larga.
+
+Se generan al guardar un producto con imagen nueva (señal de abajo) y con
+"manage.py build_image_variants" para las imágenes ya subidas. Las plantillas
+los usan vía {% load images %} (shop/templatetags/images.py).
+"""
+
+import hashlib
+import logging
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .catalog import bump_catalog_version
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+DERIVED_DIR = "products/derived"
+FORMATS = {"webp": "WEBP", "jpg": "JPEG"}
+QUALITY = 80
+
+
+def widths():
+    return sorted(settings.SHOP_IMAGE_WIDTHS)
+
+
+def content_hash(field_file):
+    digest = hashlib.sha256()
+    field_file.open("rb")
+    try:
+        for chunk in field_file.chunks():
+            digest.update(chunk)
+    finally:
+        field_file.close()
+    return digest.hexdigest()[:32]
+
+
+def variant_name(image_hash, width, ext):
+    return f"{DERIVED_DIR}/{image_hash[:2]}/{image_hash}-{width}.{ext}"
+
+
+def _flatten(image):
+    """RGB sobre fondo blanco (JPEG no tiene alfa y las tarjetas son blancas)."""
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA") or "transparency" in image.info:
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def build_variants(field_file, image_hash):
+    """Escribe los derivados que falten. Devuelve cuántos archivos creó."""
+    names = [
+        (width, ext, variant_name(image_hash, width, ext))
+        for width in widths()
+        for ext in FORMATS
+    ]
+    missing = [item for item in names if not default_storage.exists(item[2])]
+    if not missing:
+        return 0
+    field_file.open("rb")
+    try:
+        with Image.open(field_file) as source:
+            source = _flatten(source)
+    finally:
+        field_file.close()
+    for width, ext, name in missing:
+        image = source.copy()
+        # thumbnail no agranda: una imagen chica queda con su tamaño original
+        image.thumbnail((width, width * 4), Image.LANCZOS)
+        out = BytesIO()
+        image.save(out, FORMATS[ext], quality=QUALITY, optimize=True)
+        default_storage.save(name, ContentFile(out.getvalue()))
+    return len(missing)
+
+
+def process_product_image(product, force=False):
+    """
+    Calcula el hash de la imagen, genera los derivados y guarda image_hash.
+    Una imagen ilegible o ausente deja image_hash vacío: las plantillas
+    vuelven a usar el archivo original.
+    """
+    image_hash = ""
+    if product.image:
+        try:
+            image_hash = content_hash(product.image)
+            if force:
+                for width in widths():
+                    for ext in FORMATS:
+                        default_storage.delete(variant_name(image_hash, width, ext))
+            build_variants(product.image, image_hash)
+        except FileNotFoundError:
+            logger.info("La imagen de %s no existe en el storage", product.pk)
+            image_hash = ""
+        except (OSError, ValueError, Image.DecompressionBombError):
+            logger.warning("No se pudo procesar la imagen de %s", product.pk)
+            image_hash = ""
+    if image_hash != product.image_hash:
+        product.image_hash = image_hash
+        product.updated_at = timezone.now()
+        # update() para no volver a disparar post_save; la versión del
+        # catálogo se sube a mano (ver catalog.py)
+        Product.objects.filter(pk=product.pk).update(
+            image_hash=image_hash, updated_at=product.updated_at
+        )
+        bump_catalog_version()
+    product._loaded_image = product.image.name
+    return image_hash
+
+
+@receiver(post_save, sender=Product, dispatch_uid="shop_image_variants")
+def product_image_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "image" not in update_fields:
+        return
+    if "image" in instance.get_deferred_fields():
+        return
+    if instance.image.name == getattr(instance, "_loaded_image", None):
+        return
+    process_product_image(instance)
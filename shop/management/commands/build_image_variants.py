@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from shop.images import process_product_image
+from shop.models import Product
+
+
+class Command(BaseCommand):
+    help = "Genera las miniaturas JPEG/WebP de las imágenes de producto ya subidas"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force", action="store_true", help="Regenera aunque ya existan"
+        )
+
+    def handle(self, *args, **options):
+        processed = failed = 0
+        products = Product.objects.exclude(image="").exclude(image__isnull=True)
+        for product in products.iterator():
+            if process_product_image(product, force=options["force"]):
+                processed += 1
+            else:
+                failed += 1
+        self.stdout.write(
+            f"{processed} productos procesados, {failed} sin imagen válida"
+        )
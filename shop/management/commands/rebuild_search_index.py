@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from shop.models import Product
+from shop.search import ensure_search_index
+
+
+class Command(BaseCommand):
+    help = "Recrea los triggers y reindexa la tabla FTS5 de búsqueda de productos"
+
+    def handle(self, *args, **options):
+        if not ensure_search_index(connection, rebuild=True):
+            raise CommandError("La base de datos no soporta SQLite FTS5")
+        self.stdout.write(f"Índice reconstruido: {Product.objects.count()} productos")
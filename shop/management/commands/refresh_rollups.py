@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from shop.models import RollupCursor
+from shop.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = "Acumula en DailyMetrics/ProductDailyMetrics las filas nuevas desde la última pasada"
+
+    def handle(self, *args, **options):
+        refresh_rollups()
+        for cursor in RollupCursor.objects.order_by("source"):
+            self.stdout.write(f"{cursor.source}: hasta id {cursor.last_id}")
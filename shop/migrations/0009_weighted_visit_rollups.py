@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-18 13:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0008_daily_rollups"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="dailymetrics",
+            name="visits",
+            field=models.FloatField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="productdailymetrics",
+            name="views",
+            field=models.FloatField(default=0),
+        ),
+    ]
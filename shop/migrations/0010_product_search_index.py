@@ -0,0 +1,95 @@
+# Generated by Django 5.1.6 on 2026-10-18 13:50
+
+import django.db.models.deletion
+import shop.models
+from django.db import OperationalError, migrations, models
+
+# SQL copiado tal como estaba al crear la migración: los cambios de
+# shop/search.py no deben alterar lo que hace una migración ya aplicada.
+SCHEMA_SQL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS shop_product_fts USING fts5(
+        name, brand, type, description, content='shop_product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS shop_product_fts_ai AFTER INSERT ON shop_product
+    BEGIN
+        INSERT INTO shop_product_fts(rowid, name, brand, type, description)
+        VALUES (new.id, new.name, new.brand, new.type, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS shop_product_fts_ad AFTER DELETE ON shop_product
+    BEGIN
+        INSERT INTO shop_product_fts(shop_product_fts, rowid, name, brand, type, description)
+        VALUES ('delete', old.id, old.name, old.brand, old.type, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS shop_product_fts_au
+    AFTER UPDATE OF name, brand, type, description ON shop_product
+    BEGIN
+        INSERT INTO shop_product_fts(shop_product_fts, rowid, name, brand, type, description)
+        VALUES ('delete', old.id, old.name, old.brand, old.type, old.description);
+        INSERT INTO shop_product_fts(rowid, name, brand, type, description)
+        VALUES (new.id, new.name, new.brand, new.type, new.description);
+    END""",
+    "INSERT INTO shop_product_fts(shop_product_fts, rank) "
+    "VALUES ('rank', 'bm25(10.0, 5.0, 2.0, 1.0)')",
+    "INSERT INTO shop_product_fts(shop_product_fts) VALUES ('rebuild')",
+]
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS shop_product_fts_ai",
+    "DROP TRIGGER IF EXISTS shop_product_fts_ad",
+    "DROP TRIGGER IF EXISTS shop_product_fts_au",
+    "DROP TABLE IF EXISTS shop_product_fts",
+]
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    try:
+        schema_editor.execute(SCHEMA_SQL[0])
+    except OperationalError:  # SQLite compilado sin FTS5: se usa icontains
+        return
+    for sql in SCHEMA_SQL[1:]:
+        schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for sql in DROP_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0009_weighted_visit_rollups"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductSearchIndex",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        db_column="rowid",
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="search_index",
+                        serialize=False,
+                        to="shop.product",
+                    ),
+                ),
+                (
+                    "document",
+                    shop.models.SearchDocumentField(db_column="shop_product_fts"),
+                ),
+                ("rank", models.FloatField()),
+            ],
+            options={
+                "db_table": "shop_product_fts",
+                "managed": False,
+            },
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.6 on 2026-10-18 13:55
+
+from django.db import migrations, models
+from django.db.models import Avg
+
+
+def backfill_rating_avg(apps, schema_editor):
+    Product = apps.get_model("shop", "Product")
+    Review = apps.get_model("reviews_app", "Review")
+    averages = Review.objects.values("product_id").annotate(avg=Avg("rating"))
+    for row in averages:
+        Product.objects.filter(pk=row["product_id"]).update(rating_avg=row["avg"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0010_product_search_index"),
+        (
+            "reviews_app",
+            "0008_alter_review_unique_together_alter_review_comment_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="rating_avg",
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["price", "id"], name="product_price_keyset"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["-rating_avg", "-id"], name="product_rating_keyset"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["-times_added_to_cart", "-id"], name="product_popular_keyset"
+            ),
+        ),
+        migrations.RunPython(backfill_rating_avg, migrations.RunPython.noop),
+    ]
@@ -13,6 +13,118 @@ class Product(models.Model):
     quantity = models.IntegerField(default=0)
     type = models.CharField(max_length=255, default="Electrónico")
     times_added_to_cart = models.PositiveIntegerField(default=0, verbose_name=_("Veces añadido al carrito"))
+    # Promedio de reseñas desnormalizado para ordenar la tienda por rating
+    # (lo actualiza services/reviews_app/signals.py)
+    rating_avg = models.FloatField(default=0)
+    # Versión del producto para las cachés de fragmentos (shop/templatetags)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Hash del contenido de image; nombra las miniaturas (shop/images.py)
+    image_hash = models.CharField(max_length=32, blank=True, default="", editable=False)
+
+    class Meta:
+        # Índices para la paginación por keyset de la tienda (shop/pagination.py)
+        indexes = [
+            models.Index(fields=["price", "id"], name="product_price_keyset"),
+            models.Index(fields=["-rating_avg", "-id"], name="product_rating_keyset"),
+            models.Index(
+                fields=["-times_added_to_cart", "-id"], name="product_popular_keyset"
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Imagen cargada, para regenerar miniaturas solo si cambia
+        instance = super().from_db(db, field_names, values)
+        image = instance.__dict__.get("image")
+        instance._loaded_image = getattr(image, "name", image)
+        return instance
 
     def __str__(self):
         return self.name
+
+
+class DailyMetrics(models.Model):
+    """Totales por día para los reportes (se alimenta en shop/rollups.py)."""
+
+    date = models.DateField(unique=True)
+    # Suma de sample_weight de las vistas (ver services/tracking_app/sampling.py)
+    visits = models.FloatField(default=0)
+    purchases = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.date}: {self.visits} visits, {self.purchases} purchases"
+
+    @property
+    def avg_rating(self):
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
+
+class ProductDailyMetrics(models.Model):
+    """Vistas y unidades vendidas por producto y día."""
+
+    date = models.DateField()
+    # Sin FK: BrowsingHistory guarda product_id como entero suelto
+    product_id = models.IntegerField()
+    views = models.FloatField(default=0)
+    units_sold = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "product_id"], name="unique_product_daily_metrics"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.product_id}"
+
+
+class RollupCursor(models.Model):
+    """Último id ya acumulado en los rollups para cada tabla fuente."""
+
+    source = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.source} @ {self.last_id}"
+
+
+class SearchDocumentField(models.TextField):
+    """Columna oculta de la tabla FTS5 (se llama igual que la tabla)."""
+
+
+@SearchDocumentField.register_lookup
+class SearchMatch(models.Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+class ProductSearchIndex(models.Model):
+    """
+    Índice FTS5 de productos (solo SQLite, ver shop/search.py).
+    La tabla la crean la migración y ensure_search_index(), no el ORM; los
+    triggers sobre shop_product la mantienen al día en cada save/delete.
+    """
+
+    product = models.OneToOneField(
+        Product,
+        primary_key=True,
+        db_column="rowid",
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name="search_index",
+    )
+    document = SearchDocumentField(db_column="shop_product_fts")
+    rank = models.FloatField()  # bm25 con los pesos de RANK_SQL
+
+    class Meta:
+        managed = False
+        db_table = "shop_product_fts"
@@ -0,0 +1,96 @@
+"""
+Paginación por keyset (seek) con cursores opacos.
+
+En vez de OFFSET, cada página pide las filas que van después de la última
+clave vista: WHERE (k1, k2) > (v1, v2) ORDER BY k1, k2 LIMIT n. Con un
+índice sobre las mismas columnas la página 1000 cuesta lo mismo que la 1.
+La última clave de ordenamiento debe ser única (normalmente el id).
+
+El cursor es la clave firmada con django.core.signing: el cliente no
+puede editarlo y un cursor inválido vuelve a la primera página.
+"""
+
+from datetime import date
+from decimal import Decimal
+
+from django.core import signing
+from django.db.models import Q
+
+CURSOR_SALT = "shop.pagination"
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    `keys` es [(campo, descendente)], p. ej. [("price", False), ("id", False)].
+    `name` distingue cursores de distintos listados/ordenamientos.
+    """
+
+    def __init__(self, queryset, keys, page_size, name):
+        self.queryset = queryset
+        self.keys = keys
+        self.page_size = page_size
+        self.name = name
+
+    def _ordering(self):
+        return [f"-{field}" if desc else field for field, desc in self.keys]
+
+    def _after(self, values):
+        """Q de las filas que van después de `values` en el orden de keys."""
+        condition = Q()
+        for i, (field, desc) in enumerate(self.keys):
+            step = Q(**{f"{field}__{'lt' if desc else 'gt'}": values[i]})
+            for (prev_field, _), prev_value in zip(self.keys[:i], values):
+                step &= Q(**{prev_field: prev_value})
+            condition |= step
+        return condition
+
+    def encode(self, obj):
+        values = []
+        for field, _ in self.keys:
+            value = getattr(obj, field)
+            # JSON no tiene Decimal ni fechas; el ORM acepta el texto al filtrar
+            if isinstance(value, Decimal):
+                value = str(value)
+            elif isinstance(value, date):
+                value = value.isoformat()
+            values.append(value)
+        return signing.dumps([self.name, values], salt=CURSOR_SALT, compress=True)
+
+    def decode(self, cursor):
+        if not cursor:
+            return None
+        try:
+            name, values = signing.loads(cursor, salt=CURSOR_SALT)
+        except (signing.BadSignature, ValueError, TypeError):
+            return None
+        if name != self.name or len(values) != len(self.keys):
+            return None
+        return values
+
+    def page(self, cursor=None):
+        queryset = self.queryset.order_by(*self._ordering())
+        values = self.decode(cursor)
+        if values is not None:
+            queryset = queryset.filter(self._after(values))
+        items = list(queryset[: self.page_size + 1])
+        next_cursor = None
+        if len(items) > self.page_size:
+            items = items[: self.page_size]
+            next_cursor = self.encode(items[-1])
+        return KeysetPage(items, next_cursor)
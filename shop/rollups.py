@@ -0,0 +1,140 @@
+"""
+Rollups diarios para los reportes del admin.
+
+Cada fuente (BrowsingHistory, Order, ProductOrder, Review) tiene un
+RollupCursor con el último id ya acumulado. refresh_rollups() solo agrupa
+las filas nuevas desde ese id y suma sus totales en DailyMetrics y
+ProductDailyMetrics, así que el costo depende de lo nuevo y no del
+histórico completo. Las vistas suman sample_weight (filas muestreadas).
+
+Los reportes del admin acumulan a lo sumo una vez cada
+SHOP_ROLLUP_INTERVAL segundos (refresh_rollups_if_stale, con un lock en el
+caché para que un solo request lo haga); el resto de las veces solo leen.
+"python manage.py refresh_rollups" acumula en el momento (cron, o antes de
+que prune_tracking borre filas).
+
+Las reseñas editadas o borradas después de acumularse no se restan.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import TruncDate
+
+from orders.models import Order, ProductOrder
+from services.browsing_app.models import BrowsingHistory
+from services.reviews_app.models import Review
+
+from .models import DailyMetrics, ProductDailyMetrics, RollupCursor
+
+ROLLUP_LOCK_KEY = "shop:rollups:refreshed"
+
+
+def _new_rows(source, queryset):
+    """
+    Filas de `queryset` que aún no se acumularon y avanza el cursor.
+    El tope se fija antes de leer para no saltarse filas que lleguen
+    mientras se acumula.
+    """
+    cursor, _ = RollupCursor.objects.select_for_update().get_or_create(source=source)
+    upper = queryset.aggregate(top=Max("pk"))["top"]
+    if upper is None or upper <= cursor.last_id:
+        return queryset.none()
+    rows = queryset.filter(pk__gt=cursor.last_id, pk__lte=upper)
+    cursor.last_id = upper
+    cursor.save(update_fields=["last_id"])
+    return rows
+
+
+def _add(model, key, **increments):
+    """Suma `increments` a la fila `key` de `model` (la crea si no existe)."""
+    updates = {field: F(field) + value for field, value in increments.items() if value}
+    if not updates:
+        return
+    model.objects.get_or_create(**key)
+    model.objects.filter(**key).update(**updates)
+
+
+def _fold_browsing():
+    rows = _new_rows(
+        "browsing_history", BrowsingHistory.objects.filter(action="product_view")
+    )
+    per_product = (
+        rows.annotate(day=TruncDate("created_at"))
+        .values("day", "product_id")
+        .annotate(n=Sum("sample_weight"))
+    )
+    per_day = {}
+    for item in per_product:
+        per_day[item["day"]] = per_day.get(item["day"], 0) + item["n"]
+        if item["product_id"] is not None:
+            _add(
+                ProductDailyMetrics,
+                {"date": item["day"], "product_id": item["product_id"]},
+                views=item["n"],
+            )
+    for day, n in per_day.items():
+        _add(DailyMetrics, {"date": day}, visits=n)
+
+
+def _fold_orders():
+    rows = _new_rows("orders", Order.objects.all())
+    per_day = (
+        rows.annotate(day=TruncDate("created_at"))
+        .values("day")
+        .annotate(n=Count("order_id"))
+    )
+    for item in per_day:
+        _add(DailyMetrics, {"date": item["day"]}, purchases=item["n"])
+
+
+def _fold_order_lines():
+    rows = _new_rows("order_lines", ProductOrder.objects.all())
+    per_product = (
+        rows.annotate(day=TruncDate("order__created_at"))
+        .values("day", "product_id")
+        .annotate(units=Sum("quantity"))
+    )
+    for item in per_product:
+        _add(
+            ProductDailyMetrics,
+            {"date": item["day"], "product_id": item["product_id"]},
+            units_sold=item["units"],
+        )
+
+
+def _fold_reviews():
+    rows = _new_rows("reviews", Review.objects.all())
+    per_day = (
+        rows.annotate(day=TruncDate("created_at"))
+        .values("day")
+        .annotate(total=Sum("rating"), n=Count("id"))
+    )
+    for item in per_day:
+        _add(
+            DailyMetrics,
+            {"date": item["day"]},
+            rating_sum=item["total"],
+            rating_count=item["n"],
+        )
+
+
+def refresh_rollups():
+    """Acumula en los rollups todo lo escrito desde la última pasada."""
+    with transaction.atomic():
+        _fold_browsing()
+        _fold_orders()
+        _fold_order_lines()
+        _fold_reviews()
+
+
+def refresh_rollups_if_stale():
+    """
+    Acumula si pasó SHOP_ROLLUP_INTERVAL desde la última vez. cache.add es
+    atómico: con varios requests a la vez solo uno acumula.
+    """
+    if cache.add(ROLLUP_LOCK_KEY, True, timeout=settings.SHOP_ROLLUP_INTERVAL):
+        refresh_rollups()
+        return True
+    return False
@@ -0,0 +1,144 @@
+"""
+Búsqueda de productos con SQLite FTS5.
+
+shop_product_fts es una tabla FTS5 de contenido externo sobre shop_product
+(name, brand, type, description). Los triggers la actualizan en cada
+INSERT/UPDATE/DELETE, incluidos los update() y bulk_create del ORM.
+Los resultados se ordenan por BM25 (name pesa más que description) y cada
+palabra se busca como prefijo ("gal" encuentra "Galaxy").
+
+Si la base no es SQLite o no tiene FTS5 se vuelve a icontains.
+"""
+
+import re
+
+from django.db import OperationalError, connection
+from django.db.models import F, Q
+
+FTS_TABLE = "shop_product_fts"
+FTS_COLUMNS = ("name", "brand", "type", "description")
+TRIGGERS = ("shop_product_fts_ai", "shop_product_fts_ad", "shop_product_fts_au")
+
+_columns = ", ".join(FTS_COLUMNS)
+_new = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+_old = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+
+SCHEMA_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {_columns}, content='shop_product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS shop_product_fts_ai AFTER INSERT ON shop_product
+    BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS shop_product_fts_ad AFTER DELETE ON shop_product
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns})
+        VALUES ('delete', old.id, {_old});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS shop_product_fts_au
+    AFTER UPDATE OF {_columns} ON shop_product
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns})
+        VALUES ('delete', old.id, {_old});
+        INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new});
+    END""",
+]
+# Pesos BM25 por columna: name, brand, type, description
+RANK_SQL = (
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) "
+    "VALUES ('rank', 'bm25(10.0, 5.0, 2.0, 1.0)')"
+)
+REBUILD_SQL = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+DROP_SQL = [f"DROP TRIGGER IF EXISTS {name}" for name in TRIGGERS] + [
+    f"DROP TABLE IF EXISTS {FTS_TABLE}"
+]
+
+_available = {}
+
+
+def ensure_search_index(using=connection, rebuild=False):
+    """
+    Crea la tabla y los triggers si faltan. SQLite borra los triggers cuando
+    una migración reconstruye shop_product, así que esto corre también en
+    post_migrate. Reindexa si algo faltaba o si rebuild=True.
+    Devuelve False si la base no soporta FTS5.
+    """
+    if using.vendor != "sqlite":
+        return False
+    with using.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+            (FTS_TABLE, *TRIGGERS),
+        )
+        missing = len(TRIGGERS) + 1 - len(cursor.fetchall())
+        try:
+            for sql in SCHEMA_SQL:
+                cursor.execute(sql)
+        except OperationalError:  # SQLite compilado sin FTS5
+            return False
+        cursor.execute(RANK_SQL)
+        if rebuild or missing:
+            cursor.execute(REBUILD_SQL)
+    _available[using.alias] = True
+    return True
+
+
+def fts_available(using=connection):
+    if using.alias not in _available:
+        found = False
+        if using.vendor == "sqlite":
+            with using.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = %s", (FTS_TABLE,)
+                )
+                found = cursor.fetchone() is not None
+        _available[using.alias] = found
+    return _available[using.alias]
+
+
+def match_expression(text, column=None):
+    """
+    'galaxy s2' -> '"galaxy"* AND "s2"*'. Cada palabra va entre comillas
+    para que la sintaxis de FTS5 del usuario no rompa la consulta.
+    """
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    expression = " AND ".join(f'"{word}"*' for word in words)
+    if column:
+        expression = f"{column} : ({expression})"
+    return expression
+
+
+def search_products(queryset, text=None, brand=None):
+    """
+    Filtra por texto (todas las columnas) y marca, ordenado por BM25.
+    Con FTS5 cada producto trae el puntaje en search_rank (menor es mejor).
+    """
+    terms = [
+        expression
+        for expression in (match_expression(text), match_expression(brand, "brand"))
+        if expression
+    ]
+    if not terms:
+        return queryset
+    if not fts_available():
+        return _search_icontains(queryset, text, brand)
+    queryset = queryset.filter(search_index__document__match=" AND ".join(terms))
+    queryset = queryset.annotate(search_rank=F("search_index__rank"))
+    return queryset.order_by("search_rank", "-id")
+
+
+def _search_icontains(queryset, text, brand):
+    for word in (text or "").split():
+        queryset = queryset.filter(
+            Q(name__icontains=word)
+            | Q(brand__icontains=word)
+            | Q(type__icontains=word)
+            | Q(description__icontains=word)
+        )
+    if brand:
+        queryset = queryset.filter(brand__icontains=brand)
+    return queryset
@@ -0,0 +1,117 @@
+"""
+Caché de fragmentos de plantilla versionada por objeto.
+
+    {% load fragments %}
+    {% cachefragment "shop_card" product %} ... {% endcachefragment %}
+
+La clave incluye el nombre, el modelo y pk del objeto, su versión
+(updated_at y, para productos, la del resumen de reseñas), el idioma
+activo y cualquier valor extra que se pase después del objeto. Como la
+versión cambia al editar el objeto no hace falta borrar nada.
+
+No meter dentro del bloque nada que dependa del usuario ni {% csrf_token %}:
+el fragmento se comparte entre usuarios.
+"""
+
+import hashlib
+import threading
+
+from django import template
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils import translation
+
+from shop.models import Product
+
+register = template.Library()
+
+FRAGMENT_TIMEOUT = 60 * 60
+
+_lock = threading.Lock()
+counters = {"hits": 0, "misses": 0}
+
+
+def fragment_stats():
+    hits, misses = counters["hits"], counters["misses"]
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else 0,
+    }
+
+
+def _count(name):
+    with _lock:
+        counters[name] += 1
+
+
+def rating_version(product):
+    """
+    Versión del resumen de reseñas sin consultas extra: updated_at si la
+    vista trajo rating_summary con select_related, si no el promedio
+    desnormalizado del producto.
+    """
+    if not Product.rating_summary.is_cached(product):
+        return product.rating_avg
+    try:
+        return product.rating_summary.updated_at.timestamp()
+    except ObjectDoesNotExist:
+        return 0
+
+
+def object_version(obj):
+    parts = [getattr(obj, "updated_at", None)]
+    if isinstance(obj, Product):
+        parts.append(rating_version(obj))
+    return parts
+
+
+def fragment_key(name, obj, vary_on=()):
+    raw = repr((object_version(obj), [str(v) for v in vary_on]))
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    return (
+        f"fragment:{name}:{obj._meta.label_lower}:{obj.pk}:"
+        f"{translation.get_language()}:{digest}"
+    )
+
+
+class CacheFragmentNode(template.Node):
+    def __init__(self, nodelist, name, obj, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.obj = obj
+        self.vary_on = vary_on
+
+    def render(self, context):
+        obj = self.obj.resolve(context)
+        if obj is None:
+            return self.nodelist.render(context)
+        vary_on = [v.resolve(context) for v in self.vary_on]
+        key = fragment_key(self.name.resolve(context), obj, vary_on)
+        value = cache.get(key)
+        if value is not None:
+            _count("hits")
+            return value
+        _count("misses")
+        value = self.nodelist.render(context)
+        cache.set(key, value, FRAGMENT_TIMEOUT)
+        return value
+
+
+@register.tag
+def cachefragment(parser, token):
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' requiere un nombre y un objeto: "
+            '{% cachefragment "nombre" objeto [extra ...] %}'
+        )
+    nodelist = parser.parse(("endcachefragment",))
+    parser.delete_first_token()
+    return CacheFragmentNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        [parser.compile_filter(bit) for bit in bits[3:]],
+    )
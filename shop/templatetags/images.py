@@ -0,0 +1,42 @@
+"""
+URLs de las miniaturas de producto (ver shop/images.py).
+
+    {% load images %}
+    <picture>
+      {% if product.image_hash %}
+      <source type="image/webp" srcset="{% image_srcset product 'webp' %}" sizes="...">
+      {% endif %}
+      <img src="{% thumb_url product 400 %}" srcset="{% image_srcset product %}" ...>
+    </picture>
+
+Sin image_hash (imagen aún no procesada o ilegible) se usa el original.
+"""
+
+from django import template
+from django.core.files.storage import default_storage
+
+from shop.images import variant_name, widths
+
+register = template.Library()
+
+
+@register.simple_tag
+def thumb_url(product, width, ext="jpg"):
+    if not product.image:
+        return ""
+    if not product.image_hash:
+        return product.image.url
+    # El ancho más chico que cubra el pedido (o el más grande si ninguno)
+    available = widths()
+    width = next((w for w in available if w >= int(width)), available[-1])
+    return default_storage.url(variant_name(product.image_hash, width, ext))
+
+
+@register.simple_tag
+def image_srcset(product, ext="jpg"):
+    if not product.image or not product.image_hash:
+        return ""
+    return ", ".join(
+        f"{default_storage.url(variant_name(product.image_hash, w, ext))} {w}w"
+        for w in widths()
+    )
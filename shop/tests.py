@@ -1,9 +1,33 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase, Client
+from django.template import Context, Template
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import translation
 from unittest.mock import patch
+from PIL import Image
+from services.tracking_app.trending import trending
+from shop.images import variant_name
 from shop.models import Product
+from shop.catalog import catalog_version
+from shop.counters import cart_add_counter
+from shop.facets import catalog_facets, facet_counts
+from shop.pagination import KeysetPaginator
+from shop.search import search_products
+from shop.templatetags.images import image_srcset, thumb_url
+from shop.templatetags.fragments import counters, fragment_key, fragment_stats
+from shop.views import HomePageView, ShopView
+from services.reviews_app.models import Review
 
 
 # ---------- 🔹 Tests de Autenticación ----------
@@ -97,4 +121,509 @@ class ShopViewsTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, "pages/shop.html")
 
+
+# ---------- 🔹 Tests de Tendencias ----------
+class TrendingTests(TestCase):
+    def setUp(self):
+        trending.reset()
+
+    def test_trending_json_skips_out_of_stock(self):
+        hot = Product.objects.create(name="Hot", price=10, quantity=3)
+        gone = Product.objects.create(name="Gone", price=10, quantity=0)
+        for product in (hot, hot, gone, gone, gone):
+            trending.add(product.id)
+        response = self.client.get(reverse("trending_json"))
+        data = response.json()["trending"]
+        self.assertEqual([item["name"] for item in data], ["Hot"])
+
 # shop/tests/test_functionalities.py
+
+
+# ---------- 🔹 Tests de Búsqueda ----------
+class SearchTests(TestCase):
+    def setUp(self):
+        self.galaxy = Product.objects.create(
+            name="Galaxy S24",
+            price=10,
+            brand="Samsung",
+            description="Teléfono",
+            image="products/galaxy.jpg",  # la plantilla necesita una imagen
+        )
+        self.laptop = Product.objects.create(
+            name="Laptop", price=10, brand="Lenovo", description="Ideal para la galaxia"
+        )
+
+    def test_prefix_and_accents(self):
+        found = search_products(Product.objects.all(), text="telefono gal")
+        self.assertEqual(list(found), [self.galaxy])
+
+    def test_name_ranks_above_description(self):
+        found = search_products(Product.objects.all(), text="gala")
+        self.assertEqual(list(found), [self.galaxy, self.laptop])
+
+    def test_index_follows_updates_and_deletes(self):
+        Product.objects.filter(pk=self.laptop.pk).update(name="ThinkPad")
+        self.assertEqual(
+            list(search_products(Product.objects.all(), text="thinkp")), [self.laptop]
+        )
+        self.laptop.delete()
+        self.assertFalse(search_products(Product.objects.all(), text="thinkp"))
+
+    def test_brand_filter_only_matches_brand(self):
+        found = search_products(Product.objects.all(), brand="sams")
+        self.assertEqual(list(found), [self.galaxy])
+        self.assertFalse(search_products(Product.objects.all(), brand="galaxy"))
+
+    def test_shop_view_uses_index(self):
+        response = self.client.get(reverse("shop"), {"name": "s24"})
+        self.assertEqual(list(response.context["products"]), [self.galaxy])
+
+    def test_rebuild_command(self):
+        out = StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn("2 productos", out.getvalue())
+        self.assertTrue(search_products(Product.objects.all(), text="lenovo"))
+
+
+# ---------- 🔹 Tests de Facetas ----------
+class FacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Product.objects.create(name="A", price=100, brand="Samsung", type="Phones")
+        Product.objects.create(name="B", price=700, brand="Samsung", type="Tablets")
+        Product.objects.create(name="C", price=3000, brand="Dell", type="Laptops")
+
+    def test_counts_in_one_query(self):
+        with self.assertNumQueries(1):
+            facets = facet_counts(Product.objects.all())
+        self.assertEqual(facets["total"], 3)
+        self.assertEqual(dict(facets["brand"]), {"Dell": 1, "Samsung": 2})
+        self.assertEqual([b["count"] for b in facets["price"]], [1, 0, 1, 0, 1])
+
+    def test_cached_until_catalog_changes(self):
+        facets = catalog_facets()
+        with self.assertNumQueries(0):
+            self.assertEqual(catalog_facets(), facets)
+        Product.objects.create(name="D", price=10, brand="Dell", type="Laptops")
+        self.assertEqual(catalog_facets()["total"], 4)
+
+    def test_cart_counter_flush_bumps_version(self):
+        version = catalog_version()
+        cart_add_counter.add(Product.objects.get(name="A").pk)
+        cart_add_counter.flush()
+        # El orden "popular" cambió: facetas y ETags tienen que invalidarse
+        self.assertNotEqual(catalog_version(), version)
+        version = catalog_version()
+        cart_add_counter.flush()  # sin pendientes no cambia nada
+        self.assertEqual(catalog_version(), version)
+
+    def test_shop_page_shows_filtered_counts(self):
+        Product.objects.update(image="products/test.jpg")
+        response = self.client.get(reverse("shop"), {"brand": "Samsung"})
+        facets = response.context["facets"]
+        self.assertEqual(facets["total"], 2)
+        self.assertEqual([f["value"] for f in facets["type"]], ["Phones", "Tablets"])
+        self.assertIn("brand=Samsung", facets["type"][0]["url"])
+
+    def test_facet_links_match_their_counts(self):
+        Product.objects.create(name="Edge", price=500, brand="Sams", type="Phones")
+        Product.objects.update(image="products/test.jpg")
+        facets = self.client.get(reverse("shop")).context["facets"]
+        for facet in facets["price"] + facets["brand"]:
+            response = self.client.get(reverse("shop") + facet["url"])
+            self.assertEqual(
+                len(response.context["products"]), facet["count"], facet["url"]
+            )
+        # El producto de 500 cuenta en [500, 1000), no en [250, 500)
+        edge = next(b for b in facets["price"] if b["min"] == 500)
+        self.assertEqual(edge["count"], 2)
+        self.assertNotIn(500, [b["min"] for b in facets["price"] if b["max"] == 500])
+
+
+# ---------- 🔹 Tests de Paginación ----------
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i in range(5):
+            Product.objects.create(
+                name=f"P{i}", price=100 - i * 10, image="products/test.jpg"
+            )
+
+    def test_pages_follow_sort_without_overlap(self):
+        paginator = KeysetPaginator(
+            Product.objects.all(), ShopView.SORT_KEYS["price"], 2, name="shop:price"
+        )
+        seen = []
+        page = paginator.page()
+        while True:
+            seen += [p.price for p in page]
+            if not page.has_next:
+                break
+            page = paginator.page(page.next_cursor)
+        self.assertEqual(seen, sorted(Product.objects.values_list("price", flat=True)))
+
+    def test_tampered_cursor_returns_first_page(self):
+        paginator = KeysetPaginator(
+            Product.objects.all(), ShopView.SORT_KEYS["newest"], 2, name="shop:newest"
+        )
+        first = paginator.page()
+        self.assertEqual(list(paginator.page(first.next_cursor + "x")), list(first))
+
+    @patch.object(ShopView, "paginate_by", 2)
+    def test_shop_view_renders_fixed_page(self):
+        response = self.client.get(reverse("shop"), {"sort": "price"})
+        page = response.context["page"]
+        self.assertEqual([p.name for p in page], ["P4", "P3"])
+        response = self.client.get(
+            reverse("shop"), {"sort": "price", "cursor": page.next_cursor}
+        )
+        self.assertEqual([p.name for p in response.context["page"]], ["P2", "P1"])
+
+    @patch.object(ShopView, "paginate_by", 2)
+    def test_relevance_pages_over_search_rank(self):
+        names, cursor = [], None
+        while True:
+            params = {"name": "p"}
+            if cursor:
+                params["cursor"] = cursor
+            page = self.client.get(reverse("shop"), params).context["page"]
+            names += [p.name for p in page]
+            cursor = page.next_cursor
+            if not cursor:
+                break
+        self.assertEqual(sorted(names), ["P0", "P1", "P2", "P3", "P4"])
+
+    def test_rating_sort_uses_review_average(self):
+        best = Product.objects.get(name="P3")
+        Review.objects.create(product=best, rating=5)
+        best.refresh_from_db()
+        self.assertEqual(best.rating_avg, 5)
+        response = self.client.get(reverse("shop"), {"sort": "rating"})
+        self.assertEqual(response.context["products"][0], best)
+
+
+# ---------- 🔹 Tests del Home ----------
+class HomeContextTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        trending.reset()
+        Product.objects.create(name="S1", price=300, type="Smartphones", quantity=1)
+        Product.objects.create(name="S2", price=900, type="Smartphones", quantity=2)
+        Product.objects.create(name="L1", price=2000, type="Laptops", quantity=0)
+
+    def test_category_counts_and_prices(self):
+        context = self.client.get(reverse("home")).context
+        self.assertEqual(context["product_count"], 2)
+        self.assertEqual(context["smartphone_count"], 2)
+        self.assertEqual(context["smartphone_min_price"], 300)
+        self.assertEqual(context["smartphone_max_price"], 900)
+        self.assertEqual(context["laptop_count"], 0)
+        self.assertIsNone(context["laptop_min_price"])
+
+    def test_warm_cache_skips_database(self):
+        view = HomePageView()
+        view.get_context_data()
+        with self.assertNumQueries(0):
+            view.get_context_data()
+
+    def test_review_invalidates_featured(self):
+        view = HomePageView()
+        self.assertEqual(view.get_context_data()["featured_products"][0].name, "S2")
+        Review.objects.create(product=Product.objects.get(name="S1"), rating=4)
+        featured = view.get_context_data()["featured_products"]
+        self.assertEqual(featured[0].name, "S1")
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        counters.update(hits=0, misses=0)
+        self.product = Product.objects.create(
+            name="Frag Phone",
+            price=500,
+            type="Smartphones",
+            quantity=3,
+            image="products/frag.png",
+        )
+        self.template = Template(
+            '{% load fragments %}{% cachefragment "card" product %}'
+            "{{ product.name }}:{{ extra }}{% endcachefragment %}"
+        )
+
+    def render(self, **context):
+        return self.template.render(Context({"product": self.product, **context}))
+
+    def test_hit_after_miss(self):
+        self.assertEqual(self.render(extra="a"), "Frag Phone:a")
+        # El segundo render sale del caché aunque el contexto cambie
+        self.assertEqual(self.render(extra="b"), "Frag Phone:a")
+        self.assertEqual(fragment_stats()["hits"], 1)
+        self.assertEqual(fragment_stats()["misses"], 1)
+
+    def test_save_invalidates(self):
+        self.render()
+        self.product.name = "Frag Phone 2"
+        self.product.save()
+        self.assertEqual(self.render(), "Frag Phone 2:")
+
+    def test_language_in_key(self):
+        with translation.override("en"):
+            english = fragment_key("card", self.product)
+        with translation.override("es"):
+            spanish = fragment_key("card", self.product)
+        self.assertNotEqual(english, spanish)
+
+    def test_shop_card_does_not_leak_user_content(self):
+        staff = User.objects.create_user("frag", password="pw", is_staff=True)
+        self.client.force_login(staff)
+        self.client.get(reverse("shop"))
+        self.client.logout()
+        response = self.client.get(reverse("shop"))
+        self.assertGreater(fragment_stats()["hits"], 0)
+        self.assertContains(response, "Frag Phone")
+        self.assertNotContains(response, "frag</")
+        # Cada respuesta trae su propio token, fuera del fragmento
+        self.assertContains(response, "csrfmiddlewaretoken")
+
+    def test_stats_endpoint_requires_staff(self):
+        response = self.client.get(reverse("admin_fragment_stats_json"))
+        self.assertEqual(response.status_code, 302)
+        staff = User.objects.create_user("staff", password="pw", is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse("admin_fragment_stats_json"))
+        self.assertIn("hit_ratio", response.json()["fragments"])
+
+
+def png_upload(name="phone.png", size=(1200, 900), color=(200, 30, 30, 255)):
+    out = BytesIO()
+    Image.new("RGBA", size, color).save(out, "PNG")
+    return SimpleUploadedFile(name, out.getvalue(), content_type="image/png")
+
+
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def create(self, **kwargs):
+        return Product.objects.create(
+            name="Img", price=100, type="Smartphones", quantity=1, **kwargs
+        )
+
+    def test_upload_builds_variants_by_hash(self):
+        product = self.create(image=png_upload())
+        product.refresh_from_db()
+        self.assertEqual(len(product.image_hash), 32)
+        for width in (200, 400, 800):
+            name = variant_name(product.image_hash, width, "webp")
+            self.assertTrue(default_storage.exists(name))
+            with default_storage.open(name) as f, Image.open(f) as image:
+                self.assertEqual(image.width, width)
+        self.assertIn("400w", image_srcset(product, "webp"))
+        self.assertTrue(thumb_url(product, 300).endswith("-400.jpg"))
+
+    def test_same_content_shares_files(self):
+        first = self.create(image=png_upload("a.png"))
+        second = self.create(image=png_upload("b.png"))
+        self.assertEqual(first.image_hash, second.image_hash)
+
+    def test_invalid_image_falls_back_to_original(self):
+        upload = SimpleUploadedFile("bad.png", b"no es una imagen")
+        with self.assertLogs("shop.images", "WARNING"):
+            product = self.create(image=upload)
+        self.assertEqual(product.image_hash, "")
+        self.assertEqual(thumb_url(product, 400), product.image.url)
+        self.assertEqual(image_srcset(product), "")
+
+    def test_unrelated_save_does_not_reprocess(self):
+        product = Product.objects.get(pk=self.create(image=png_upload()).pk)
+        with patch("shop.images.process_product_image") as process:
+            product.price = 120
+            product.save()
+        process.assert_not_called()
+
+    def test_backfill_command(self):
+        product = self.create(image=png_upload())
+        Product.objects.filter(pk=product.pk).update(image_hash="")
+        out = StringIO()
+        call_command("build_image_variants", stdout=out)
+        product.refresh_from_db()
+        self.assertEqual(len(product.image_hash), 32)
+        self.assertIn("1 productos procesados", out.getvalue())
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(
+            name="Etag Phone",
+            price=300,
+            type="Smartphones",
+            quantity=5,
+            image="products/etag.png",
+        )
+
+    def revalidate(self, url):
+        etag = self.client.get(url)["ETag"]
+        return etag, self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_shop_returns_304_without_queries(self):
+        etag, response = self.revalidate(reverse("shop"))
+        self.assertEqual(response.status_code, 304)
+        self.assertIn("no-cache", response["Cache-Control"])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("shop"), HTTP_IF_NONE_MATCH=etag)
+        # Solo el evento de tracking del middleware; la vista no consulta nada
+        self.assertFalse([q for q in queries if "shop_product" in q["sql"]])
+
+    def test_product_save_changes_etag(self):
+        url = reverse("product_detail", args=[self.product.id])
+        etag, response = self.revalidate(url)
+        self.assertEqual(response.status_code, 304)
+        self.product.price = 350
+        self.product.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_depends_on_user_and_cart(self):
+        url = reverse("shop")
+        anonymous = self.client.get(url)["ETag"]
+        session = self.client.session
+        session["cart_product_data"] = {str(self.product.id): 1}
+        session.save()
+        with_cart = self.client.get(url)["ETag"]
+        self.assertNotEqual(anonymous, with_cart)
+        self.client.force_login(User.objects.create_user("etag", password="pw"))
+        self.assertNotIn(self.client.get(url)["ETag"], (anonymous, with_cart))
+
+    def test_rotated_csrf_secret_changes_etag(self):
+        etag, response = self.revalidate(reverse("shop"))
+        self.assertEqual(response.status_code, 304)
+        # Loguearse rota el secreto CSRF; la página cacheada tiene el viejo
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = "x" * 32
+        response = self.client.get(reverse("shop"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_pending_messages_skip_etag(self):
+        etag = self.client.get(reverse("shop"))["ETag"]
+        Product.objects.filter(pk=self.product.pk).update(quantity=0)
+        # Agregar un producto agotado deja un mensaje de error pendiente
+        self.client.post(reverse("add_cart", args=[self.product.id]))
+        response = self.client.get(reverse("shop"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header("ETag"))
+
+
+class CartServiceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("cart", password="pw")
+        self.client.force_login(self.user)
+        self.products = [
+            Product.objects.create(
+                name=f"Cart {i}",
+                price=10 * (i + 1),
+                quantity=5,
+                image=f"products/cart{i}.png",
+            )
+            for i in range(4)
+        ]
+
+    def fill(self, products, quantity=2):
+        session = self.client.session
+        session["cart_product_data"] = {str(p.id): quantity for p in products}
+        session.save()
+
+    def product_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [q for q in queries if 'FROM "shop_product"' in q["sql"]]
+
+    def test_cart_page_loads_products_once(self):
+        self.fill(self.products[:1])
+        one = self.product_queries(reverse("cart_index"))
+        self.fill(self.products)
+        many = self.product_queries(reverse("cart_index"))
+        self.assertEqual(len(one), 1)
+        self.assertEqual(len(many), 1)
+
+    def test_totals_and_stale_ids(self):
+        self.fill(self.products[:2], quantity=3)
+        session = self.client.session
+        session["cart_product_data"]["999"] = 1
+        session["cart_product_data"]["abc"] = 1
+        session.save()
+        context = self.client.get(reverse("cart_index")).context
+        cart = context["cart"]
+        self.assertEqual(len(cart.lines), 2)
+        self.assertEqual(cart.total, 3 * 10 + 3 * 20)
+        self.assertEqual(context["cart_count"], 4)
+
+    def test_update_and_remove(self):
+        product = self.products[0]
+        self.client.post(reverse("add_cart", args=[product.id]), {"quantity": 2})
+        self.client.post(reverse("cart_update_quantity", args=[product.id]), {"quantity": 4})
+        self.assertEqual(self.client.session["cart_product_data"], {str(product.id): 4})
+        self.client.post(reverse("remove_cart", args=[product.id]))
+        self.assertEqual(self.client.session["cart_product_data"], {})
+
+
+@override_settings(SHOP_CART_COUNTER={"FLUSH_SIZE": 100, "FLUSH_INTERVAL": 3600})
+class CartAddCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        cart_add_counter.reset()
+        self.addCleanup(cart_add_counter.reset)
+        self.staff = User.objects.create_user("counter", password="pw", is_staff=True)
+        self.client.force_login(self.staff)
+        self.phone = Product.objects.create(
+            name="Phone", price=100, quantity=9, times_added_to_cart=5
+        )
+        self.case = Product.objects.create(
+            name="Case", price=10, quantity=9, times_added_to_cart=4
+        )
+
+    def add(self, product, times=1):
+        for _ in range(times):
+            self.client.post(reverse("add_cart", args=[product.id]))
+
+    def test_adds_stay_in_memory_until_flush(self):
+        self.add(self.case, 3)
+        self.case.refresh_from_db()
+        self.assertEqual(self.case.times_added_to_cart, 4)
+        self.assertEqual(cart_add_counter.pending(), {self.case.id: 3})
+
+    @override_settings(SHOP_CART_COUNTER={"FLUSH_SIZE": 3, "FLUSH_INTERVAL": 3600})
+    def test_flushes_when_enough_adds_pile_up(self):
+        self.add(self.case, 2)
+        self.assertEqual(len(cart_add_counter), 2)
+        self.assertFalse(cart_add_counter.is_due())
+        self.add(self.phone)
+        # El request que completa el lote lo escribe al terminar
+        self.assertEqual(len(cart_add_counter), 0)
+        self.case.refresh_from_db()
+        self.assertEqual(self.case.times_added_to_cart, 6)
+
+    def test_flush_is_a_single_update(self):
+        self.add(self.case, 2)
+        self.add(self.phone)
+        with self.assertNumQueries(1):
+            cart_add_counter.flush()
+        self.case.refresh_from_db()
+        self.phone.refresh_from_db()
+        self.assertEqual(self.case.times_added_to_cart, 6)
+        self.assertEqual(self.phone.times_added_to_cart, 6)
+        self.assertEqual(cart_add_counter.pending(), {})
+
+    def test_report_merges_pending_counts(self):
+        self.add(self.case, 3)
+        rows = self.client.get(reverse("most_added_to_cart")).context["products_data"]
+        self.assertEqual([r["product"].name for r in rows], ["Case", "Phone"])
+        self.assertEqual(rows[0]["count"], 7)
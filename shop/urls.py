@@ -12,6 +12,11 @@ urlpatterns = [
     path("", HomePageView.as_view(), name="home"),
     path("shop/", ShopView.as_view(), name="shop"),
     path("shop/product/<int:id>/", ProductDetailView.as_view(), name="product_detail"),
+    path(
+        "shop/product/<int:id>/reviews/",
+        views.product_reviews_json,
+        name="product_reviews_json",
+    ),
     path("cart/", CartView.as_view(), name="cart_index"),
     path("cart/add/<int:product_id>/", CartView.as_view(), name="add_cart"),
     path("cart/remove/<int:product_id>/", CartRemoveView.as_view(), name="remove_cart"),
@@ -25,6 +30,7 @@ urlpatterns = [
     re_path(r'^admin_product/?$', admin_product_view.as_view(), name='admin_product_noslash'),
     path("admin_product/generar_reporte/<str:tipo>/",GenerarReporteView.as_view(), name="generar_reporte"),
     path("productos-aliados/", ProductosAliadosView.as_view(), name="productos_aliados"),
+    path("api/trending/", views.trending_json, name="trending_json"),
 ]
 
 urlpatterns += [
@@ -36,6 +42,7 @@ urlpatterns += [
     path("admin/reports/ratings/data/", views.rating_stats_json, name="admin_reports_ratings_json"),
     path("admin/reports/top-products/", views.top_products_page, name="admin_top_products"),
     path("admin/reports/top-products/data/", views.top_products_json, name="admin_top_products_json"),
+    path("admin/reports/fragments/", views.fragment_stats_json, name="admin_fragment_stats_json"),
     path('admin/reports/export/', GenerarReporteView.as_view(), name='admin_reports_export'),
     path("admin/browsing-history-ui/", TemplateView.as_view(template_name="admin/browsing_history.html"), name="admin_browsing_history_ui"),
     path("admin/most-added-to-cart/", MostAddedToCartView.as_view(), name="most_added_to_cart"),
@@ -1,101 +1,134 @@
+from urllib.parse import urlencode
+
 import requests
 from django import forms
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils.decorators import method_decorator
 from django.utils.translation import gettext_lazy as _
 from django.views import View
 from django.views.generic import ListView, TemplateView
-from django.db.models import Avg, Count, F, Q
+from django.db.models import Avg, Count, F, Max, Min, Q
+from django.db.models.functions import Coalesce
 from services.reviews_app.forms import ReviewForm
-from services.reviews_app.utils import user_purchased_product
+from services.reviews_app.models import ProductRatingSummary
+from services.reviews_app.utils import purchased_product_ids, user_purchased_product
 from services.browsing_app.models import BrowsingHistory
+from services.tracking_app.trending import trending
 from django.core.paginator import Paginator
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 
 # from .reportes import ReporteExcel, ReportePDF
 from .models import Product
+from .cart import Cart
+from .catalog import catalog_version
+from .counters import cart_add_counter
+from .conditional import conditional_get, page_etag
+from .facets import cached_facets, catalog_facets
+from .pagination import KeysetPaginator
+from .search import search_products
+from .templatetags.fragments import fragment_stats
+
+
+def trending_products(n=4):
+    """
+    Productos en tendencia (sketch en memoria) con stock, en orden.
+    Una sola consulta para traer los productos.
+    """
+    scores = trending.top(n * 2)  # margen para borrados / sin stock
+    products = Product.objects.filter(quantity__gt=0).in_bulk(
+        [pid for pid, _ in scores]
+    )
+    result = []
+    for pid, score in scores:
+        if pid in products:
+            product = products[pid]
+            product.trending_score = score
+            result.append(product)
+    return result[:n]
+
+
+def trending_json(request):
+    try:
+        n = min(max(int(request.GET.get("n", 10)), 1), 50)
+    except ValueError:
+        n = 10
+    data = [
+        {"product_id": p.id, "name": p.name, "score": round(p.trending_score, 2)}
+        for p in trending_products(n)
+    ]
+    return JsonResponse({"trending": data})
+
+
+@staff_member_required
+def fragment_stats_json(request):
+    """Aciertos/fallos de la caché de fragmentos de este proceso."""
+    return JsonResponse({"fragments": fragment_stats()})
 
 
 # Create your views here.
 class HomePageView(TemplateView):
     template_name = "pages/home.html"
-    
+    # Categorías con contador y rango de precios en el home (prefijo de contexto)
+    CATEGORIES = {"Smartphones": "smartphone", "Laptops": "laptop", "Tablets": "tablet"}
+    CACHE_TIMEOUT = 60 * 60
+    TRENDING_TIMEOUT = 60
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        
-        # Total de productos
-        context['product_count'] = Product.objects.filter(quantity__gt=0).count()
-        
-        # Productos por tipo
-        smartphones = Product.objects.annotate(
-            avg_rating=Avg('reviews__rating'),
-            reviews_count=Count('reviews', distinct=True)
-        ).filter(type="Smartphones", quantity__gt=0).order_by('-id')
-        
-        laptops = Product.objects.annotate(
-            avg_rating=Avg('reviews__rating'),
-            reviews_count=Count('reviews', distinct=True)
-        ).filter(type="Laptops", quantity__gt=0).order_by('-id')
-        
-        tablets = Product.objects.annotate(
-            avg_rating=Avg('reviews__rating'),
-            reviews_count=Count('reviews', distinct=True)
-        ).filter(type="Tablets", quantity__gt=0).order_by('-id')
-        
-        # Contar productos por categoría
-        context['smartphone_count'] = smartphones.count()
-        context['laptop_count'] = laptops.count()
-        context['tablet_count'] = tablets.count()
-        
-        # Rango de precios por categoría
-        if smartphones.exists():
-            smartphone_prices = smartphones.aggregate(min_price=Min('price'), max_price=Max('price'))
-            context['smartphone_min_price'] = smartphone_prices['min_price']
-            context['smartphone_max_price'] = smartphone_prices['max_price']
-        else:
-            context['smartphone_min_price'] = None
-            context['smartphone_max_price'] = None
-        
-        if laptops.exists():
-            laptop_prices = laptops.aggregate(min_price=Min('price'), max_price=Max('price'))
-            context['laptop_min_price'] = laptop_prices['min_price']
-            context['laptop_max_price'] = laptop_prices['max_price']
-        else:
-            context['laptop_min_price'] = None
-            context['laptop_max_price'] = None
-        
-        if tablets.exists():
-            tablet_prices = tablets.aggregate(min_price=Min('price'), max_price=Max('price'))
-            context['tablet_min_price'] = tablet_prices['min_price']
-            context['tablet_max_price'] = tablet_prices['max_price']
-        else:
-            context['tablet_min_price'] = None
-            context['tablet_max_price'] = None
-        
-        # Productos destacados (con mejor rating y reviews)
-        featured_products = Product.objects.annotate(
-            avg_rating=Avg('reviews__rating'),
-            reviews_count=Count('reviews', distinct=True)
-        ).filter(
-            quantity__gt=0,
-            reviews_count__gt=0
-        ).order_by('-avg_rating', '-reviews_count')[:3]
-        
+        # Con caché caliente el home no toca la base de datos: la clave cambia
+        # con la versión del catálogo (saves/deletes de Product y Review)
+        version = catalog_version()
+        context.update(
+            cache.get_or_set(
+                f"shop:home:{version}", self.catalog_context, self.CACHE_TIMEOUT
+            )
+        )
+        # Las tendencias cambian sin tocar el catálogo: TTL corto aparte
+        context['trending_products'] = cache.get_or_set(
+            f"shop:home:trending:{version}", trending_products, self.TRENDING_TIMEOUT
+        )
+        context['title'] = "Buy4U - Your Electronic Devices Store"
+        return context
+
+    def catalog_context(self):
+        in_stock = Product.objects.filter(quantity__gt=0)
+        context = {'product_count': in_stock.count()}
+
+        # Conteo y rango de precios de todas las categorías en una consulta
+        per_type = {
+            row['type']: row
+            for row in in_stock.filter(type__in=self.CATEGORIES)
+            .values('type')
+            .annotate(
+                count=Count('id'), min_price=Min('price'), max_price=Max('price')
+            )
+            .order_by()
+        }
+        for type_name, prefix in self.CATEGORIES.items():
+            row = per_type.get(type_name, {})
+            context[f'{prefix}_count'] = row.get('count', 0)
+            context[f'{prefix}_min_price'] = row.get('min_price')
+            context[f'{prefix}_max_price'] = row.get('max_price')
+
+        # Productos destacados (con mejor rating y reviews), leídos del resumen
+        rated = in_stock.select_related('rating_summary').annotate(
+            avg_rating=F('rating_avg'),
+            reviews_count=Coalesce('rating_summary__count', 0),
+        )
+        featured_products = list(
+            rated.filter(reviews_count__gt=0).order_by('-avg_rating', '-reviews_count')[:3]
+        )
         # Si no hay productos con reviews, mostrar los más recientes
-        if not featured_products.exists():
-            featured_products = Product.objects.annotate(
-                avg_rating=Avg('reviews__rating'),
-                reviews_count=Count('reviews', distinct=True)
-            ).filter(quantity__gt=0).order_by('-id')[:3]
-        
+        if not featured_products:
+            featured_products = list(rated.order_by('-id')[:3])
         context['featured_products'] = featured_products
-        context['title'] = "Buy4U - Your Electronic Devices Store"
-        
         return context
 
 
@@ -134,6 +167,12 @@ class ProductFilterForm(forms.Form):
             attrs={"class": "form-control", "placeholder": _("Brand")}
         ),
     )
+    # Los usan los enlaces de facetas (facet_links) para filtrar con los
+    # mismos límites con que se cuentan: tope exclusivo y marca exacta
+    price_lt = forms.DecimalField(
+        required=False, min_value=0, widget=forms.HiddenInput()
+    )
+    brand_exact = forms.CharField(required=False, widget=forms.HiddenInput())
 
     type = forms.ChoiceField(
         choices=[],
@@ -141,60 +180,185 @@ class ProductFilterForm(forms.Form):
         label=_("Type"),
         widget=forms.Select(attrs={"class": "form-select"}),
     )
+    sort = forms.ChoiceField(
+        choices=[
+            ("", _("Relevance")),
+            ("newest", _("Newest")),
+            ("price", _("Lowest price")),
+            ("rating", _("Best rated")),
+            ("popular", _("Most popular")),
+        ],
+        required=False,
+        label=_("Sort by"),
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        types = Product.objects.values_list("type", flat=True).distinct()
-        self.fields["type"].choices = [("", _("All"))] + [(t, t) for t in types]
+        types = catalog_facets()["type"]
+        self.fields["type"].choices = [("", _("All"))] + [
+            (t, f"{t} ({n})") for t, n in types
+        ]
+
+
+def purchases_etag(request):
+    """ETag de páginas que marcan los productos comprados por el usuario."""
+    return page_etag(request, sorted(purchased_product_ids(request.user)))
 
 
 class ShopView(View):
     template_name = "pages/shop.html"
-
+    paginate_by = 12
+
+    # Claves de keyset por orden; cada una tiene su índice en Product.Meta
+    SORT_KEYS = {
+        "newest": [("id", True)],
+        "price": [("price", False), ("id", False)],
+        "rating": [("rating_avg", True), ("id", True)],
+        "popular": [("times_added_to_cart", True), ("id", True)],
+        "relevance": [("search_rank", False), ("id", True)],
+    }
+
+    @method_decorator(conditional_get(purchases_etag))
     def get(self, request):
         form = ProductFilterForm(request.GET)
         products = Product.objects.all()
+        params = {}
 
         if form.is_valid():
+            params = {
+                k: str(v) for k, v in form.cleaned_data.items() if v not in (None, "")
+            }
             name = form.cleaned_data.get("name")
             min_price = form.cleaned_data.get("min_price")
             max_price = form.cleaned_data.get("max_price")
             brand = form.cleaned_data.get("brand")
+            price_lt = form.cleaned_data.get("price_lt")
+            brand_exact = form.cleaned_data.get("brand_exact")
             type = form.cleaned_data.get("type")
-            query = request.GET.get('name', '').strip()
-            if query:
-                BrowsingHistory.objects.create(
-                    user=request.user if request.user.is_authenticated else None,
-                    session_key=request.session.session_key,
-                    action='search',
-                    query=query,
-                    path=request.get_full_path()
-                )
-            if name:
-                products = products.filter(name__icontains=name)
+            # La búsqueda queda registrada por UserInteractionMiddleware
+            products = search_products(products, text=name, brand=brand)
             if min_price is not None:
                 products = products.filter(price__gte=min_price)
             if max_price is not None:
                 products = products.filter(price__lte=max_price)
-            if brand:
-                products = products.filter(brand__icontains=brand)
+            if price_lt is not None:
+                products = products.filter(price__lt=price_lt)
+            if brand_exact:
+                products = products.filter(brand=brand_exact)
             if type:
                 products = products.filter(type__iexact=type)
-    
+
+        # Sin búsqueda por texto no hay search_rank: "relevancia" = más nuevos
+        sort = params.get("sort") or "relevance"
+        if sort == "relevance" and "search_rank" not in products.query.annotations:
+            sort = "newest"
+        page = KeysetPaginator(
+            products, self.SORT_KEYS[sort], self.paginate_by, name=f"shop:{sort}"
+        ).page(request.GET.get("cursor"))
+
+        filters = {k: v for k, v in params.items() if k != "sort"}
         view_data = {
             "title": _("Shop - Buy4U"),
             "subtitle": _("List of products"),
-            "products": products,
+            "products": page.items,
+            "page": page,
+            # Insignia "ya lo compraste" en la grilla (un solo set cacheado)
+            "purchased_ids": purchased_product_ids(request.user),
             "form": form,
+            "facets": facet_links(cached_facets(products, filters), params),
         }
         return render(request, self.template_name, view_data)
 
 
+def facet_links(facets, params):
+    """
+    Agrega a cada faceta la URL con ese filtro sumado a los actuales. Los
+    enlaces filtran igual que facet_counts cuenta: marca exacta y rangos
+    [mínimo, máximo), así el número del enlace es lo que muestra la página.
+    """
+
+    def url(**changes):
+        query = {k: v for k, v in {**params, **changes}.items() if v is not None}
+        return "?" + urlencode(query)
+
+    return {
+        "total": facets["total"],
+        "type": [
+            {"value": t, "count": n, "url": url(type=t)} for t, n in facets["type"]
+        ],
+        "brand": [
+            {"value": b, "count": n, "url": url(brand=None, brand_exact=b)}
+            for b, n in facets["brand"]
+        ],
+        "price": [
+            {
+                **bucket,
+                "url": url(
+                    min_price=bucket["min"], max_price=None, price_lt=bucket["max"]
+                ),
+            }
+            for bucket in facets["price"]
+            if bucket["count"]
+        ],
+    }
+
+
 import math
 
+REVIEWS_PAGE_SIZE = 10
+
+# Claves de keyset por orden; cada una tiene su índice en Review.Meta
+REVIEW_SORT_KEYS = {
+    "recent": [("created_at", True), ("id", True)],
+    "rating": [("rating", True), ("created_at", True), ("id", True)],
+    "useful": [("useful_count", True), ("created_at", True), ("id", True)],
+}
+
+
+def review_page(product, sort, cursor=None):
+    reviews = product.reviews.select_related("user")
+    paginator = KeysetPaginator(
+        reviews,
+        REVIEW_SORT_KEYS[sort],
+        REVIEWS_PAGE_SIZE,
+        name=f"reviews:{product.pk}:{sort}",
+    )
+    return paginator.page(cursor)
+
+
+def product_reviews_json(request, id):
+    """Siguiente página de reseñas ("cargar más" en el detalle del producto)."""
+    product = get_object_or_404(Product, pk=id)
+    sort = request.GET.get("sort", "recent")
+    if sort not in REVIEW_SORT_KEYS:
+        sort = "recent"
+    page = review_page(product, sort, request.GET.get("cursor"))
+    html = "".join(
+        render_to_string("pages/review_card.html", {"r": review}, request=request)
+        for review in page
+    )
+    return JsonResponse({
+        "reviews": [
+            {
+                "id": r.id,
+                "user": r.get_user_display_name(),
+                "rating": r.rating,
+                "comment": r.comment,
+                "useful_count": r.useful_count,
+                "created_at": r.created_at.isoformat(),
+            }
+            for r in page
+        ],
+        "html": html,
+        "next_cursor": page.next_cursor,
+    })
+
+
 class ProductDetailView(View):
     template_name = "pages/product_detail.html"
 
+    @method_decorator(conditional_get(purchases_etag))
     def get(self, request, id):
         try:
             product_id = int(id)
@@ -204,37 +368,31 @@ class ProductDetailView(View):
         except (ValueError, IndexError):
             return HttpResponseRedirect(reverse("home"))
 
-        # ⬇️ ORDENAMIENTO
+        # ⬇️ ORDENAMIENTO (primera página; el resto llega por product_reviews_json)
         sort = request.GET.get("sort", "recent")
-        if sort == "rating":
-            reviews_qs = product.reviews.select_related("user").order_by("-rating", "-created_at")
-        elif sort == "useful":
-            reviews_qs = product.reviews.select_related("user").order_by("-useful_count", "-created_at")
-        else:
-            # recent (default)
-            reviews_qs = product.reviews.select_related("user").order_by("-created_at")
+        if sort not in REVIEW_SORT_KEYS:
+            sort = "recent"
+        reviews_page = review_page(product, sort)
 
         can_review = user_purchased_product(request.user, product)
         review_form = ReviewForm() if can_review else None
 
         # Calcular promedio y descomponerlo en estrellas completas, medias y vacías
-        avg = product.reviews.aggregate(avg=Avg("rating"), total=Count("id"))
-        avg_rating = avg["avg"] or 0
-        reviews_count = avg["total"] or 0
+        summary = ProductRatingSummary.for_product(product)
+        avg_rating = summary.average
+        reviews_count = summary.count
         
         # Calcular estrellas: completas, media, vacías
         full_stars = int(math.floor(avg_rating))  # Estrellas completas
         has_half_star = (avg_rating - full_stars) >= 0.3  # Media estrella si decimal >= 0.3
         empty_stars = 5 - full_stars - (1 if has_half_star else 0)  # Resto vacías
 
-        # 🔴 IMPORTANTE: Convertir QuerySet a lista para asegurar que se evalúe
-        reviews_list = list(reviews_qs)
-        
         view_data = {
             "title": product.name + _(" - Buy4U"),
             "subtitle": product.name + _(" - Product information"),
             "product": product,
-            "reviews": reviews_list,
+            "reviews": reviews_page.items,
+            "reviews_page": reviews_page,
             "can_review": can_review,
             "review_form": review_form,
             "sort": sort,
@@ -251,25 +409,15 @@ class CartView(View):
     template_name = "cart/cart.html"
 
     def get(self, request):
-        # Extracting from the database the products available
-        products = Product.objects.all()
-
-        # Get cart items from session - USAR LA MISMA CLAVE
-        cart_products = {}
-        cart_product_data = request.session.get("cart_product_data", {})
-
-        for product_id, quantity in cart_product_data.items():
-            try:
-                product = get_object_or_404(Product, id=int(product_id))
-                cart_products[product] = quantity
-            except:
-                continue
+        # Todos los productos del carrito en una consulta (shop/cart.py)
+        cart = Cart.for_request(request)
 
         # Data for the view
         view_data = {
             "title": _("Cart - Buy4U"),
             "subtitle": _("Shopping cart"),
-            "cart_products": cart_products,
+            "cart": cart,
+            "cart_products": {line.product: line.quantity for line in cart},
         }
         return render(request, self.template_name, view_data)
 
@@ -282,24 +430,11 @@ class CartView(View):
                 messages.error(request, _("Este producto no está disponible"))
                 return redirect("shop")
             
-            # Incrementar contador de veces añadido
-            Product.objects.filter(pk=product_id).update(times_added_to_cart=F('times_added_to_cart') + 1)
+            # Incrementar contador de veces añadido (se escribe agrupado)
+            cart_add_counter.add(product.pk)
             
-            # USAR LA MISMA CLAVE: cart_product_data
-            cart_product_data = request.session.get("cart_product_data", {})
             quantity = int(request.POST.get("quantity", 1))
-            
-            # Convertir product_id a string para consistencia
-            product_id_str = str(product_id)
-            
-            if product_id_str in cart_product_data:
-                cart_product_data[product_id_str] += quantity
-            else:
-                cart_product_data[product_id_str] = quantity
-            
-            # Guardar en sesión
-            request.session["cart_product_data"] = cart_product_data
-            request.session.modified = True  # Forzar guardado
+            Cart.for_request(request).add(product_id, quantity)
             
             messages.success(request, _("Product added to cart successfully"))
             return redirect("cart_index")
@@ -317,15 +452,9 @@ class CartUpdateQuantityView(View):
         if not request.user.is_authenticated:
             return redirect("login")
 
-        cart_product_data = request.session.get("cart_product_data", {})
-
         quantity = int(request.POST.get("quantity", 1))
-        if quantity > 0:
-            cart_product_data[str(product_id)] = quantity
-        else:
-            del cart_product_data[str(product_id)]  # Elimina si la cantidad es 0
-
-        request.session["cart_product_data"] = cart_product_data
+        # Con cantidad 0 se quita del carrito
+        Cart.for_request(request).set(product_id, quantity)
         return redirect("cart_index")
 
 
@@ -335,18 +464,12 @@ class CartRemoveView(View):
     def post(self, request, product_id):
         if not request.user.is_authenticated:
             return redirect("login")
-        cart_product_data = request.session.get("cart_product_data", {})
-        product_id = str(product_id)
-
-        if product_id in cart_product_data:
-            del cart_product_data[str(product_id)]
-            request.session["cart_product_data"] = cart_product_data
+        Cart.for_request(request).remove(product_id)
         return redirect("cart_index")
 
 
 def cart_count(request):
-    cart_count = len(request.session.get("cart_product_data", {}))
-    return {"cart_count": cart_count}
+    return {"cart_count": len(Cart.for_request(request))}
 
 
 class admin_product_view(View):
@@ -619,8 +742,7 @@ from django.utils.decorators import method_decorator
 from django.http import JsonResponse, HttpResponse
 from django.views import View
 from django.utils import timezone
-from django.db.models import Count, Avg
-from django.db.models.functions import TruncDate
+from django.db.models import Count, Avg, Sum
 import csv
 from datetime import timedelta, date
 
@@ -628,6 +750,8 @@ from services.browsing_app.models import BrowsingHistory
 from services.reviews_app.models import Review
 from shop.models import Product
 from orders.models import Order  # ajusta el import si tu app/archivo se llama diferente
+from .models import DailyMetrics, ProductDailyMetrics
+from .rollups import refresh_rollups_if_stale
 
 @method_decorator(staff_member_required, name='dispatch')
 class ReportsOverviewView(TemplateView):
@@ -648,35 +772,14 @@ def reports_data_json(request):
     end_date = timezone.localdate()
     start_date = end_date - timedelta(days=days-1)
 
-    # Visits per day (BrowsingHistory action='product_view')
-    visits_qs = (
-        BrowsingHistory.objects
-        .filter(action='product_view', created_at__date__gte=start_date, created_at__date__lte=end_date)
-        .annotate(day=TruncDate('created_at'))
-        .values('day')
-        .annotate(count=Count('id'))
-        .order_by('day')
-    )
-
-    # Purchases per day (Order) — cuenta por order_id porque tu modelo tiene ese campo
-    purchases_qs = (
-        Order.objects
-        .filter(created_at__date__gte=start_date, created_at__date__lte=end_date)
-        .annotate(day=TruncDate('created_at'))
-        .values('day')
-        .annotate(count=Count('order_id'))   # usa order_id tal como aparece en tu modelo
-        .order_by('day')
-    )
-
-    # Avg rating per day (Review)
-    ratings_qs = (
-        Review.objects
-        .filter(created_at__date__gte=start_date, created_at__date__lte=end_date)
-        .annotate(day=TruncDate('created_at'))
-        .values('day')
-        .annotate(avg_rating=Avg('rating'))
-        .order_by('day')
-    )
+    # Visitas (product_view), compras y ratings salen de los rollups diarios:
+    # una lectura por rango de fechas en vez de agrupar las tablas completas.
+    # Se acumulan a lo sumo cada SHOP_ROLLUP_INTERVAL segundos.
+    refresh_rollups_if_stale()
+    metrics = {
+        m.date.isoformat(): m
+        for m in DailyMetrics.objects.filter(date__range=(start_date, end_date))
+    }
 
     # build a list of labels covering the full date range so chart.js siempre tenga todas las fechas
     labels = []
@@ -684,14 +787,10 @@ def reports_data_json(request):
         d = start_date + timedelta(days=i)
         labels.append(d.isoformat())
 
-    # helper dicts for quick lookup
-    visits_map = {str(item['day']): item['count'] for item in visits_qs}
-    purchases_map = {str(item['day']): item['count'] for item in purchases_qs}
-    ratings_map = {str(item['day']): float(item['avg_rating']) if item['avg_rating'] is not None else None for item in ratings_qs}
-
-    visits = [visits_map.get(lbl, 0) for lbl in labels]
-    purchases = [purchases_map.get(lbl, 0) for lbl in labels]
-    avg_ratings = [ratings_map.get(lbl, None) for lbl in labels]
+    # visits es una suma de pesos de muestreo: se redondea a entero
+    visits = [round(metrics[lbl].visits) if lbl in metrics else 0 for lbl in labels]
+    purchases = [metrics[lbl].purchases if lbl in metrics else 0 for lbl in labels]
+    avg_ratings = [metrics[lbl].avg_rating if lbl in metrics else None for lbl in labels]
 
     return JsonResponse({
         "labels": labels,
@@ -709,71 +808,46 @@ def reports_top_json(request):
     end_date = timezone.localdate()
     start_date = end_date - timedelta(days=days-1)
 
-    # Top viewed: contar BrowsingHistory por product_id
+    # Top viewed / top bought desde el rollup diario por producto
+    refresh_rollups_if_stale()
+    per_product = ProductDailyMetrics.objects.filter(date__range=(start_date, end_date))
     top_viewed_qs = (
-        BrowsingHistory.objects
-        .filter(action='product_view', created_at__date__gte=start_date, created_at__date__lte=end_date, product_id__isnull=False)
+        per_product
         .values('product_id')
-        .annotate(views=Count('id'))
+        .annotate(views=Sum('views'))
+        .filter(views__gt=0)
         .order_by('-views')[:n]
     )
-    product_ids_viewed = [item['product_id'] for item in top_viewed_qs]
-    products_viewed = Product.objects.in_bulk(product_ids_viewed)
+    bought_qs = (
+        per_product
+        .values('product_id')
+        .annotate(qty=Sum('units_sold'))
+        .filter(qty__gt=0)
+        .order_by('-qty')[:n]
+    )
+    products = Product.objects.in_bulk(
+        [i['product_id'] for i in top_viewed_qs] + [i['product_id'] for i in bought_qs]
+    )
+
     top_viewed = []
     for item in top_viewed_qs:
         pid = item['product_id']
-        p = products_viewed.get(pid)
+        p = products.get(pid)
         top_viewed.append({
             "product_id": pid,
             "product_name": p.name if p else "Unknown",
-            "views": item['views'],
+            "views": round(item['views']),
         })
 
-    # Top bought: dependiendo de cómo almacenas order-product relation.
-    # Si Order tiene M2M "products" o "product_orders" con qty, adapta la consulta.
-    # Aquí asumo que hay una relación Order.products (m2m) o ProductOrder con order and product.
-    # Intento contar por product en la tabla intermedia si existe:
     top_bought = []
-    try:
-        # Attempts for common patterns:
-        # 1) if you have a through model `ProductOrder` with (order, product, quantity)
-        from orders.models import ProductOrder  # ajusta nombre si es distinto
-        bought_qs = (
-            ProductOrder.objects
-            .filter(order__created_at__date__gte=start_date, order__created_at__date__lte=end_date)
-            .values('product_id')
-            .annotate(qty=Count('id'))  # si hay campo quantity usa Sum('quantity')
-            .order_by('-qty')[:n]
-        )
-        product_ids_bought = [i['product_id'] for i in bought_qs]
-        products_bought = Product.objects.in_bulk(product_ids_bought)
-        for it in bought_qs:
-            pid = it['product_id']
-            p = products_bought.get(pid)
-            top_bought.append({
-                "product_id": pid,
-                "product_name": p.name if p else "Unknown",
-                "qty": it['qty'],
-            })
-    except Exception:
-        # Fallback: si no existe ProductOrder, intentamos contar orders.products (m2m)
-        try:
-            bought_qs = (
-                Order.objects
-                .filter(created_at__date__gte=start_date, created_at__date__lte=end_date)
-                .values('products__id', 'products__name')
-                .annotate(qty=Count('products__id'))
-                .order_by('-qty')[:n]
-            )
-            for it in bought_qs:
-                top_bought.append({
-                    "product_id": it.get('products__id'),
-                    "product_name": it.get('products__name') or "Unknown",
-                    "qty": it.get('qty'),
-                })
-        except Exception:
-            # No data source found — devolver vacío
-            top_bought = []
+    for it in bought_qs:
+        pid = it['product_id']
+        p = products.get(pid)
+        top_bought.append({
+            "product_id": pid,
+            "product_name": p.name if p else "Unknown",
+            "qty": it['qty'],
+        })
 
     return JsonResponse({
         "top_viewed": top_viewed,
@@ -787,24 +861,12 @@ def export_reports_csv(request):
     end_date = timezone.localdate()
     start_date = end_date - timedelta(days=days-1)
 
-    # build visits and purchases (simple rows)
-    visits_qs = (
-        BrowsingHistory.objects
-        .filter(action='product_view', created_at__date__gte=start_date, created_at__date__lte=end_date)
-        .annotate(day=TruncDate('created_at'))
-        .values('day')
-        .annotate(views=Count('id'))
-        .order_by('day')
-    )
-
-    purchases_qs = (
-        Order.objects
-        .filter(created_at__date__gte=start_date, created_at__date__lte=end_date)
-        .annotate(day=TruncDate('created_at'))
-        .values('day')
-        .annotate(orders=Count('order_id'))
-        .order_by('day')
-    )
+    # build visits and purchases (simple rows) desde los rollups diarios
+    refresh_rollups_if_stale()
+    metrics = {
+        m.date.isoformat(): m
+        for m in DailyMetrics.objects.filter(date__range=(start_date, end_date))
+    }
 
     # zip days together for CSV rows
     labels = []
@@ -812,8 +874,8 @@ def export_reports_csv(request):
         d = start_date + timedelta(days=i)
         labels.append(d.isoformat())
 
-    visits_map = {str(x['day']): x['views'] for x in visits_qs}
-    purchases_map = {str(x['day']): x['orders'] for x in purchases_qs}
+    visits_map = {lbl: round(m.visits) for lbl, m in metrics.items()}
+    purchases_map = {lbl: m.purchases for lbl, m in metrics.items()}
 
     filename = f"reports_{start_date.isoformat()}_to_{end_date.isoformat()}.csv"
     resp = HttpResponse(content_type='text/csv')
@@ -883,28 +945,21 @@ def rating_stats_json(request):
     except (TypeError, ValueError):
         top = None
 
-    qs = Review.objects.values(name=F("product__name")).annotate(
-        avg_rating=Avg("rating"),
-        reviews_count=Count("id"),
-    ).order_by("-avg_rating")
-
-    # intentar StdDev solo si DB lo soporta
-    try:
-        from django.db.models import StdDev
-        qs = qs.annotate(stddev_rating=StdDev("rating"))
-    except Exception:
-        # en SQLite omitimos desviación
-        qs = qs.annotate(stddev_rating=None)
-
+    # Promedio y desviación salen de los momentos del resumen (también en SQLite)
+    summaries = (
+        ProductRatingSummary.objects.filter(count__gt=0)
+        .select_related("product")
+        .order_by("-product__rating_avg")
+    )
     if top:
-        qs = qs[:top]
+        summaries = summaries[:top]
 
     data = [{
-        "name": r["name"],
-        "avg_rating": round(r["avg_rating"], 2) if r["avg_rating"] else 0,
-        "stddev_rating": round(r.get("stddev_rating") or 0, 2),
-        "reviews_count": r["reviews_count"]
-    } for r in qs]
+        "name": s.product.name,
+        "avg_rating": round(s.average, 2),
+        "stddev_rating": round(s.stddev, 2),
+        "reviews_count": s.count,
+    } for s in summaries]
 
     return JsonResponse({"rating_stats": data})
 
@@ -943,7 +998,7 @@ def top_products_json(request):
         BrowsingHistory.objects
         .filter(action="product_view", product_id__isnull=False)
         .values("product_id")
-        .annotate(views=Count("id"))
+        .annotate(views=Sum("sample_weight"))  # filas muestreadas pesan 1/tasa
         .order_by("-views")[:n]
     )
 
@@ -964,7 +1019,7 @@ def top_products_json(request):
         product = Product.objects.filter(id=v["product_id"]).first()
         top_viewed_list.append({
             "product": product.name if product else "Unknown",
-            "views": v["views"]
+            "views": round(v["views"])
         })
 
     for b in top_bought_qs:
@@ -1026,7 +1081,7 @@ class GenerarReporteView(View):
         top_views = (BrowsingHistory.objects
                      .filter(action='product_view', product_id__isnull=False)
                      .values('product_id')
-                     .annotate(views=Count('id'))
+                     .annotate(views=Sum('sample_weight'))
                      .order_by('-views')[:20])
 
         # Top por compras: intentar usar orders.ProductOrder o el modelo de pedidos
@@ -1071,7 +1126,7 @@ class GenerarReporteView(View):
             for tv in top_views:
                 pid = tv.get("product_id")
                 pname = product_names.get(pid, f"Producto {pid}")
-                writer.writerow(["Visualizaciones", pname, "Vistas", tv.get("views")])
+                writer.writerow(["Visualizaciones", pname, "Vistas", round(tv.get("views"))])
 
             # Escribir compras
             for tb in top_bought:
@@ -1094,14 +1149,26 @@ class MostAddedToCartView(View):
     """HU15: Productos más añadidos al carrito"""
     template_name = "admin/most_added_to_cart.html"
     
+    limit = 20
+
     def get(self, request):
-        # Obtener productos ordenados por veces añadidos
-        products = Product.objects.filter(
-            times_added_to_cart__gt=0
-        ).order_by('-times_added_to_cart')[:20]
+        # Totales de la base más los incrementos aún no escritos
+        # (shop/counters.py); un pendiente puede meter a otro producto al top
+        pending = cart_add_counter.pending()
+        top = list(
+            Product.objects.filter(times_added_to_cart__gt=0)
+            .order_by('-times_added_to_cart')[:self.limit]
+        )
+        top += Product.objects.filter(pk__in=pending).exclude(
+            pk__in=[p.pk for p in top]
+        )
+        for product in top:
+            product.times_added_to_cart += pending.get(product.pk, 0)
+        top.sort(key=lambda p: (-p.times_added_to_cart, p.pk))
+        products = top[:self.limit]
         
         # Calcular porcentaje del más añadido
-        max_count = products.first().times_added_to_cart if products else 1
+        max_count = products[0].times_added_to_cart if products else 1
         
         products_data = []
         for product in products:
@@ -1115,7 +1182,7 @@ class MostAddedToCartView(View):
         context = {
             'title': _('Most Added to Cart Products'),
             'products_data': products_data,
-            'total_products': products.count()
+            'total_products': len(products)
         }
         
         return render(request, self.template_name, context)
@@ -1185,10 +1252,8 @@ def comparar_productos_ia(request):
             }, status=404)
         
         # Preparar datos con calificaciones
-        from django.db.models import Avg, Count
-        
-        p1_reviews = p1.reviews.aggregate(avg=Avg('rating'), count=Count('id'))
-        p2_reviews = p2.reviews.aggregate(avg=Avg('rating'), count=Count('id'))
+        p1_summary = ProductRatingSummary.for_product(p1)
+        p2_summary = ProductRatingSummary.for_product(p2)
         
         producto1_data = {
             'name': p1.name,
@@ -1197,8 +1262,8 @@ def comparar_productos_ia(request):
             'type': p1.type,
             'description': p1.description,
             'warranty': p1.warranty,
-            'avg_rating': round(p1_reviews['avg'], 2) if p1_reviews['avg'] else 0,
-            'reviews_count': p1_reviews['count']
+            'avg_rating': round(p1_summary.average, 2),
+            'reviews_count': p1_summary.count
         }
         
         producto2_data = {
@@ -1208,8 +1273,8 @@ def comparar_productos_ia(request):
             'type': p2.type,
             'description': p2.description,
             'warranty': p2.warranty,
-            'avg_rating': round(p2_reviews['avg'], 2) if p2_reviews['avg'] else 0,
-            'reviews_count': p2_reviews['count']
+            'avg_rating': round(p2_summary.average, 2),
+            'reviews_count': p2_summary.count
         }
         
         gemini_service = GeminiService()